@@ -1,5 +1,6 @@
 from sqlalchemy.future import select
 from models.plan import Plan
+from models.user_subscription import UserSubscription
 from schemas.plan_schemas import PlanCreate
 
 """
@@ -37,4 +38,13 @@ class PlanDAL:
         List all subscription plans in the database.
         """
         result = await self.db_session.execute(select(Plan))
-        return result.scalars().all() 
\ No newline at end of file
+        return result.scalars().all()
+
+    async def get_user_plan(self, user_id):
+        """
+        Retrieve the plan of a user's subscription, if any.
+        """
+        result = await self.db_session.execute(
+            select(Plan).join(UserSubscription, UserSubscription.planId == Plan.id).where(UserSubscription.userId == user_id)
+        )
+        return result.scalars().first()
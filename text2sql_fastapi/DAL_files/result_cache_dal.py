@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import time
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+from config import settings
+from redis_store import get_cached_result, store_cached_result, incr_cache_counter, get_cache_counters
+from schemas.tool_schemas import ToolInDB
+from tools.async_sql import AsyncSQLTools
+from tools.query_result import QueryResult, dumps
+
+"""
+Data Access Layer for query results cached in Redis, so repeated dashboard
+queries do not hit the customer database again.
+"""
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE = "result"
+# Bumped whenever the cached entry layout changes
+RESULT_CACHE_FORMAT = 3
+
+
+def result_cache_key(fingerprint: str, sql: str, limit: Optional[int]) -> str:
+    """
+    Cache key for a SQL statement's result against a schema fingerprint and row limit.
+    """
+    sql_hash = hashlib.sha256(" ".join(sql.split()).encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{RESULT_CACHE_FORMAT}|{fingerprint}|{sql_hash}|{limit}".encode("utf-8")).hexdigest()
+
+
+def tool_result_ttl(tool: Optional[ToolInDB]) -> int:
+    """
+    Result TTL for a tool: `tool_config["result_cache_ttl"]` when set, else the default.
+    """
+    if tool is not None and isinstance(tool.tool_config, dict):
+        ttl = tool.tool_config.get("result_cache_ttl")
+        if isinstance(ttl, (int, float)) and not isinstance(ttl, bool):
+            return max(int(ttl), 0)
+    return settings.result_cache_ttl
+
+
+def _cache_entry(query_result: QueryResult) -> Dict[str, Any]:
+    # Decimals are stored as their exact text and the columns holding them listed,
+    # so a cached result reads back with the same types as a fresh one
+    decimal_columns = sorted({
+        index for row in query_result.rows for index, value in enumerate(row) if isinstance(value, Decimal)
+    })
+    return {"cached_at": time.time(), "decimal_columns": decimal_columns, **query_result.to_dict()}
+
+
+def _cached_result(entry: Dict[str, Any]) -> QueryResult:
+    decimal_columns = entry.get("decimal_columns")
+    if decimal_columns:
+        entry["rows"] = [
+            [Decimal(value) if index in decimal_columns and isinstance(value, str) else value for index, value in enumerate(row)]
+            for row in entry["rows"]
+        ]
+    return QueryResult.from_dict(entry)
+
+
+class CacheStatus:
+    """
+    Whether a result came from the cache, and how old it is. Rendered as the
+    X-Cache and Age response headers.
+    """
+    def __init__(self, status: str, age: int = 0):
+        self.status = status
+        self.age = age
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"X-Cache": self.status}
+        if self.status == "HIT":
+            headers["Age"] = str(self.age)
+        return headers
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"status": self.status, "age": self.age}
+
+
+class ResultCacheDAL:
+    """
+    Data Access Layer mapping (schema fingerprint, SQL hash, limit) to the result of
+    `run_query`. Entries expire after their tool's TTL and the cache is bounded
+    by `result_cache_max_bytes` with least recently used eviction.
+    """
+    async def run_query(
+        self,
+        sql_tools: AsyncSQLTools,
+        fingerprint: Optional[str],
+        sql: str,
+        ttl: int,
+        limit: Optional[int] = 10,
+    ) -> Tuple[QueryResult, CacheStatus]:
+        """
+        Return the result of a query from the cache, or run it and cache it.
+        """
+        if not fingerprint or ttl <= 0:
+            return await sql_tools.run_query(sql, limit=limit), CacheStatus("BYPASS")
+
+        key = result_cache_key(fingerprint, sql, limit)
+        try:
+            cached = await get_cached_result(key)
+            await incr_cache_counter(RESULT_CACHE, "hits" if cached is not None else "misses")
+        except Exception as e:
+            logger.warning(f"Result cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            entry = orjson.loads(cached)
+            return _cached_result(entry), CacheStatus("HIT", int(time.time() - entry["cached_at"]))
+
+        query_result = await sql_tools.run_query(sql, limit=limit)
+        if query_result.ok:
+            value = dumps(_cache_entry(query_result)).decode("utf-8")
+            if len(value) <= settings.result_cache_max_entry_bytes:
+                try:
+                    await store_cached_result(key, value, ttl, settings.result_cache_max_bytes)
+                except Exception as e:
+                    logger.warning(f"Result cache write failed: {e}")
+        return query_result, CacheStatus("MISS")
+
+    async def stats(self) -> Dict[str, int]:
+        """
+        Hit and miss counters across all workers.
+        """
+        counters = await get_cache_counters(RESULT_CACHE)
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0)}
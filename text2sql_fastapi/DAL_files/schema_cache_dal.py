@@ -0,0 +1,76 @@
+import hashlib
+import logging
+from typing import Optional
+from config import settings
+from redis_store import get_cached_schema, store_cached_schema, invalidate_cached_schema
+from tools.async_sql import AsyncSQLTools
+from tools.engine_registry import normalize_db_url
+from tools.schema_reflector import DatabaseSchema
+
+"""
+Data Access Layer for reflected customer database schemas cached in Redis.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Fingerprint marker of schemas cached without a version probe
+UNPROBED_PREFIX = "unprobed-"
+
+
+def database_key(db_url: str, schema: Optional[str] = None) -> str:
+    """
+    Stable, credential-free key identifying a customer database (and schema).
+    """
+    raw = f"{normalize_db_url(db_url)}|{schema or ''}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+
+class SchemaCacheDAL:
+    """
+    Data Access Layer serving reflected schemas from Redis, re-reflecting only
+    when the database's schema version probe changes.
+    """
+    async def get_schema(self, sql_tools: AsyncSQLTools, db_url: str) -> DatabaseSchema:
+        """
+        Return the schema for a database, from Redis when it is still current.
+        The returned schema's fingerprint is `<database key>:<schema version>`.
+        """
+        db_key = database_key(db_url, sql_tools.schema)
+        version = await sql_tools.schema_version()
+
+        try:
+            cached = await get_cached_schema(db_key)
+        except Exception as e:
+            logger.warning(f"Schema cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            db_schema = DatabaseSchema.model_validate_json(cached)
+            if version is None:
+                # Without a probe only entries stored with the shorter unprobed TTL are
+                # trusted; a failed probe must not keep serving a probed 7-day entry
+                current = db_schema.fingerprint.startswith(f"{db_key}:{UNPROBED_PREFIX}")
+            else:
+                current = db_schema.fingerprint == f"{db_key}:{version}"
+            if current:
+                return db_schema
+
+        db_schema = await sql_tools.reflect_schema()
+        if version is None:
+            content_hash = hashlib.sha1(db_schema.model_dump_json().encode("utf-8")).hexdigest()[:16]
+            db_schema.fingerprint = f"{db_key}:{UNPROBED_PREFIX}{content_hash}"
+            expiry = settings.schema_cache_unprobed_ttl
+        else:
+            db_schema.fingerprint = f"{db_key}:{version}"
+            expiry = settings.schema_cache_ttl
+
+        try:
+            await store_cached_schema(db_key, db_schema.model_dump_json(), expiry)
+        except Exception as e:
+            logger.warning(f"Schema cache write failed: {e}")
+        return db_schema
+
+    async def invalidate(self, db_url: str, schema: Optional[str] = None) -> bool:
+        """
+        Drop the cached schema for a database. Returns True if one was cached.
+        """
+        return await invalidate_cached_schema(database_key(db_url, schema))
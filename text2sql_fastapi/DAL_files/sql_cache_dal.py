@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional
+from config import settings
+from redis_store import get_cached_sql, store_cached_sql, delete_cached_sql, incr_cache_counter, get_cache_counters
+from tools.prompt_matcher import NearDuplicateIndex, NearDuplicateMatch, schema_vocabulary
+from tools.schema_reflector import DatabaseSchema
+
+"""
+Data Access Layer for validated SQL generated from prompts, cached in Redis.
+"""
+
+logger = logging.getLogger(__name__)
+
+SQL_CACHE = "sql"
+NEAR_DUPLICATE_CACHE = "near_duplicate"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Canonical form of a prompt: Unicode-normalized, lower-cased, single-spaced,
+    without surrounding punctuation.
+    """
+    prompt = unicodedata.normalize("NFKC", prompt).lower()
+    prompt = re.sub(r"\s+", " ", prompt)
+    return prompt.strip(" \t\n?!.,;:\"'")
+
+
+def sql_cache_key(fingerprint: str, prompt: str, tool_version: str) -> str:
+    """
+    Cache key for a prompt against a schema fingerprint and tool-set version.
+    """
+    raw = f"{fingerprint}|{tool_version}|{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SQLCacheDAL:
+    """
+    Data Access Layer mapping (schema fingerprint, normalized prompt, tool-set version)
+    to validated SQL plus the tool and parameters used to build it. Also keeps a
+    per-worker near-duplicate index of the prompts it has seen.
+    """
+    def __init__(self):
+        self.near_duplicates = NearDuplicateIndex(
+            max_fingerprints=settings.near_duplicate_max_fingerprints,
+            max_entries=settings.near_duplicate_max_prompts,
+        )
+        # Schema terms per fingerprint, for near-duplicate matching
+        self._vocabularies: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+
+    def _vocabulary(self, db_schema: DatabaseSchema) -> FrozenSet[str]:
+        vocabulary = self._vocabularies.get(db_schema.fingerprint)
+        if vocabulary is None:
+            names = [name for table in db_schema.tables.values() for name in [table.name, *(column.name for column in table.columns)]]
+            vocabulary = self._vocabularies[db_schema.fingerprint] = schema_vocabulary(names)
+            while len(self._vocabularies) > settings.near_duplicate_max_fingerprints:
+                self._vocabularies.popitem(last=False)
+        self._vocabularies.move_to_end(db_schema.fingerprint)
+        return vocabulary
+
+    async def get(self, fingerprint: Optional[str], prompt: str, tool_version: str) -> Optional[Dict[str, Any]]:
+        """
+        Return `{"used_tool", "sql_query", "params"}` for a cached prompt, or None.
+        """
+        if not fingerprint:
+            return None
+        try:
+            cached = await get_cached_sql(sql_cache_key(fingerprint, prompt, tool_version))
+            await incr_cache_counter(SQL_CACHE, "hits" if cached is not None else "misses")
+        except Exception as e:
+            logger.warning(f"SQL cache read failed: {e}")
+            return None
+        if cached is None:
+            return None
+        entry = json.loads(cached)
+        # Learn prompts cached by other workers too
+        self.near_duplicates.add(f"{fingerprint}|{tool_version}", normalize_prompt(prompt), entry)
+        return entry
+
+    async def find_similar(self, db_schema: DatabaseSchema, prompt: str, tool_version: str) -> Optional[NearDuplicateMatch]:
+        """
+        Return the validated SQL of a past prompt asking the same question in other
+        words, or None. Prompts with different numbers, negation and time words,
+        "by" terms or non-schema terms (filter values) never match.
+        """
+        fingerprint = db_schema.fingerprint
+        if not fingerprint or settings.near_duplicate_threshold <= 0:
+            return None
+        match = self.near_duplicates.match(
+            f"{fingerprint}|{tool_version}", normalize_prompt(prompt), settings.near_duplicate_threshold,
+            self._vocabulary(db_schema),
+        )
+        try:
+            await incr_cache_counter(NEAR_DUPLICATE_CACHE, "hits" if match is not None else "misses")
+        except Exception as e:
+            logger.warning(f"Near-duplicate counter update failed: {e}")
+        return match
+
+    async def store(
+        self,
+        fingerprint: Optional[str],
+        prompt: str,
+        tool_version: str,
+        sql_query: str,
+        used_tool: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Cache SQL that executed successfully for a prompt.
+        """
+        if not fingerprint:
+            return
+        entry = {"used_tool": used_tool, "sql_query": sql_query, "params": params}
+        self.near_duplicates.add(f"{fingerprint}|{tool_version}", normalize_prompt(prompt), entry)
+        value = json.dumps(entry, default=str)
+        try:
+            await store_cached_sql(
+                sql_cache_key(fingerprint, prompt, tool_version),
+                value,
+                settings.sql_cache_ttl,
+                settings.sql_cache_max_entries,
+            )
+        except Exception as e:
+            logger.warning(f"SQL cache write failed: {e}")
+
+    async def discard(self, fingerprint: Optional[str], prompt: str, tool_version: str) -> None:
+        """
+        Forget the SQL cached for a prompt, e.g. after it failed validation or execution.
+        """
+        if not fingerprint:
+            return
+        self.near_duplicates.remove(f"{fingerprint}|{tool_version}", normalize_prompt(prompt))
+        try:
+            await delete_cached_sql(sql_cache_key(fingerprint, prompt, tool_version))
+        except Exception as e:
+            logger.warning(f"SQL cache delete failed: {e}")
+
+    async def stats(self, cache: str = SQL_CACHE) -> Dict[str, int]:
+        """
+        Hit and miss counters across all workers.
+        """
+        counters = await get_cache_counters(cache)
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0)}
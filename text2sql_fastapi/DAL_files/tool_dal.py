@@ -1,8 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import text
 from models.tool import Tool
 from schemas.tool_schemas import ToolCreate, ToolUpdate
+from DAL_files.tool_registry_dal import TOOLS_CHANNEL, tool_registry
 from typing import Optional, List
 import uuid
 
@@ -20,6 +22,15 @@ class ToolDAL:
         """
         self.db_session = db_session
 
+    async def _notify_change(self, tool_id: uuid.UUID) -> None:
+        """
+        Queue a NOTIFY (delivered on commit) so every worker refreshes its cached tools.
+        """
+        await self.db_session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": TOOLS_CHANNEL, "payload": str(tool_id)}
+        )
+
     async def get_by_id(self, tool_id: uuid.UUID) -> Optional[Tool]:
         """
         Retrieve a tool by its unique ID.
@@ -41,7 +52,10 @@ class ToolDAL:
         tool_obj = Tool(**tool_data.dict())
         self.db_session.add(tool_obj)
         try:
+            await self.db_session.flush()
+            await self._notify_change(tool_obj.tool_id)
             await self.db_session.commit()
+            tool_registry.invalidate()
             await self.db_session.refresh(tool_obj)
             return tool_obj
         except IntegrityError:
@@ -58,7 +72,9 @@ class ToolDAL:
         for field, value in tool_update.dict(exclude_unset=True).items():
             setattr(tool_obj, field, value)
         try:
+            await self._notify_change(tool_id)
             await self.db_session.commit()
+            tool_registry.invalidate()
             await self.db_session.refresh(tool_obj)
             return tool_obj
         except IntegrityError:
@@ -73,5 +89,7 @@ class ToolDAL:
         if not tool_obj:
             return False
         await self.db_session.delete(tool_obj)
+        await self._notify_change(tool_id)
         await self.db_session.commit()
+        tool_registry.invalidate()
         return True 
\ No newline at end of file
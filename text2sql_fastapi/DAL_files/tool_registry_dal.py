@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import List, Optional
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from config import settings
+from database import SQLALCHEMY_DATABASE_URL
+from models.tool import Tool
+from schemas.tool_schemas import ToolInDB
+from tools.tool_index import ToolIndex
+
+"""
+Data Access Layer for the per-worker cache of SQL tools used on the /chat hot path.
+Refreshed when ToolDAL writes emit a Postgres NOTIFY, with a TTL as a safety net.
+"""
+
+TOOLS_CHANNEL = "tools_changed"
+
+
+class ToolSet:
+    """
+    Immutable snapshot of every tool plus its search index and a content version
+    that is identical across workers for the same tools.
+    """
+    def __init__(self, tools: List[ToolInDB]):
+        self.tools = tools
+        self.index = ToolIndex(tools)
+        payload = json.dumps([tool.model_dump(mode="json") for tool in tools], sort_keys=True)
+        self.version = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+        self._by_name = {tool.name: tool for tool in tools}
+
+    def get(self, name: Optional[str]) -> Optional[ToolInDB]:
+        """
+        Look up a tool by name.
+        """
+        return self._by_name.get(name) if name else None
+
+
+class ToolRegistryDAL:
+    """
+    Data Access Layer holding the cached ToolSet for this worker.
+    """
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._tool_set: Optional[ToolSet] = None
+        self._loaded_at = 0.0
+        # Bumped on every invalidation so a reload racing a NOTIFY is not kept
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self._listener: Optional[asyncpg.Connection] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopped = False
+
+    def invalidate(self, *args) -> None:
+        """
+        Mark the cached tools stale. Also used as the NOTIFY and connection-loss callback.
+        """
+        self._generation += 1
+        self._tool_set = None
+
+    def _is_fresh(self) -> bool:
+        return self._tool_set is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def get_tool_set(self, db_session: AsyncSession) -> ToolSet:
+        """
+        Return the cached tools, reloading them from the database if stale.
+        """
+        if self._is_fresh():
+            return self._tool_set
+        async with self._lock:
+            if self._is_fresh():
+                return self._tool_set
+            generation = self._generation
+            result = await db_session.execute(select(Tool).order_by(Tool.created_at))
+            tool_set = ToolSet([ToolInDB.model_validate(tool) for tool in result.scalars().all()])
+            if generation == self._generation:
+                self._tool_set = tool_set
+                self._loaded_at = time.monotonic()
+            return tool_set
+
+    async def _connect_listener(self) -> bool:
+        """
+        Open the LISTEN connection. Returns False (after logging) if it failed.
+        """
+        try:
+            dsn = SQLALCHEMY_DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+            listener = await asyncpg.connect(dsn)
+            await listener.add_listener(TOOLS_CHANNEL, self.invalidate)
+            listener.add_termination_listener(self._listener_terminated)
+        except Exception as e:
+            print(f"⚠️ Tool change listener unavailable, relying on TTL: {e}")
+            return False
+        self._listener = listener
+        print(f"👂 Listening for {TOOLS_CHANNEL} notifications")
+        return True
+
+    def _listener_terminated(self, *args) -> None:
+        """
+        The LISTEN connection was lost: changes may be missed, so drop the cached
+        tools and reconnect in the background.
+        """
+        self.invalidate()
+        self._listener = None
+        if not self._stopped and (self._reconnect_task is None or self._reconnect_task.done()):
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        """
+        Retry the LISTEN connection with exponential backoff until it is back.
+        """
+        delay = 1.0
+        while not self._stopped:
+            await asyncio.sleep(delay)
+            if await self._connect_listener():
+                # Notifications sent while disconnected were lost
+                self.invalidate()
+                return
+            delay = min(delay * 2, settings.tool_listener_max_backoff)
+
+    async def start_listener(self) -> None:
+        """
+        LISTEN for tool changes on a dedicated connection, reconnecting with backoff
+        when it is lost. Meanwhile the TTL keeps bounding staleness.
+        """
+        self._stopped = False
+        if not await self._connect_listener():
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def stop_listener(self) -> None:
+        """
+        Stop reconnecting and close the LISTEN connection.
+        """
+        self._stopped = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+
+tool_registry = ToolRegistryDAL(ttl=settings.tool_registry_ttl)
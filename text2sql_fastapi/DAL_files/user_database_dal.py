@@ -0,0 +1,210 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+
+from config import settings
+from DAL_files.schema_cache_dal import SchemaCacheDAL
+from models.user_database import UserDatabase
+from tools.async_sql import AsyncSQLTools, to_async_db_url
+from tools.engine_registry import async_engine_registry, engine_registry, normalize_db_url
+from tools.schema_reflector import DatabaseSchema
+from tools.sql import SQLTools
+from utils import decrypt_secret
+
+"""
+Data Access Layer for registered customer databases (user_databases), and the
+per-worker registry that keeps each one decrypted, with a warm engine and its
+schema, so /chat requests by db_id skip URL parsing, engine setup and reflection.
+"""
+
+# user_databases.db_type aliases -> SQLAlchemy dialect names
+DB_TYPE_DIALECTS = {"postgres": "postgresql"}
+
+
+def registered_db_url(user_database: UserDatabase) -> str:
+    """
+    Connection URL of a registered database, with its password decrypted.
+    """
+    db_type = user_database.db_type.lower()
+    drivername = DB_TYPE_DIALECTS.get(db_type, db_type)
+    if drivername.startswith("sqlite"):
+        url = URL.create(drivername, database=user_database.database_name)
+    else:
+        url = URL.create(
+            drivername,
+            username=user_database.username,
+            password=decrypt_secret(user_database.password_encrypted),
+            host=user_database.host,
+            port=user_database.port,
+            database=user_database.database_name,
+        )
+    return normalize_db_url(url.render_as_string(hide_password=False))
+
+
+def registered_credentials(user_database: UserDatabase) -> Tuple[Any, ...]:
+    """
+    Connection fields of a registered database as stored (password still encrypted),
+    compared to notice when they change.
+    """
+    return (
+        user_database.db_type,
+        user_database.host,
+        user_database.port,
+        user_database.username,
+        user_database.password_encrypted,
+        user_database.database_name,
+    )
+
+
+class UserDatabaseDAL:
+    """
+    Data Access Layer for a user's registered databases.
+    """
+    def __init__(self, db_session: AsyncSession):
+        """
+        Initialize with a database session.
+        """
+        self.db_session = db_session
+
+    async def get_user_database(self, db_id: UUID, user_id: str) -> Optional[UserDatabase]:
+        """
+        Retrieve a registered database, if it belongs to the user.
+        """
+        result = await self.db_session.execute(
+            select(UserDatabase).where(UserDatabase.db_id == db_id, UserDatabase.user_id == user_id)
+        )
+        return result.scalars().first()
+
+    async def update_sync_status(self, db_id: UUID, connection_status: str) -> None:
+        """
+        Record the outcome of connecting to a registered database; `last_synced_at`
+        is set when its schema was loaded successfully.
+        """
+        values = {"connection_status": connection_status}
+        if connection_status == "connected":
+            values["last_synced_at"] = func.now()
+        await self.db_session.execute(update(UserDatabase).where(UserDatabase.db_id == db_id).values(**values))
+        await self.db_session.commit()
+
+
+class RegisteredDatabase:
+    """
+    A registered database ready to query: its decrypted, normalized URL, the
+    engine key to reuse, and its schema as of the last check.
+    """
+    def __init__(self, db_id: UUID, user_id: str, db_url: str, credentials: Optional[Tuple[Any, ...]] = None):
+        self.db_id = db_id
+        self.user_id = user_id
+        self.db_url = db_url
+        # `registered_credentials` of the row the URL was built from
+        self.credentials = credentials
+        # Normalized async URL, or None when the dialect runs on the thread pool
+        self.async_url = to_async_db_url(db_url)
+        if self.async_url is not None:
+            self.async_url = normalize_db_url(self.async_url)
+        self.db_schema: Optional[DatabaseSchema] = None
+        self.schema_checked_at = 0.0
+
+    async def sql_tools(self, statement_timeout_ms: Optional[int] = None) -> AsyncSQLTools:
+        """
+        Toolkit on the database's pooled engine, without parsing its URL again.
+        """
+        if self.async_url is not None:
+            db_engine = await async_engine_registry.get_engine(self.async_url, normalized=True)
+            return AsyncSQLTools(db_engine=db_engine, statement_timeout_ms=statement_timeout_ms)
+        sync_tools = SQLTools(db_engine=engine_registry.get_engine(self.db_url, normalized=True), statement_timeout_ms=statement_timeout_ms)
+        return AsyncSQLTools(sync_tools=sync_tools, statement_timeout_ms=statement_timeout_ms)
+
+    def schema_is_fresh(self) -> bool:
+        return self.db_schema is not None and time.monotonic() - self.schema_checked_at < settings.registered_schema_check_interval
+
+
+class DatabaseRegistryDAL:
+    """
+    Per-worker LRU of registered databases. Credentials are decrypted once per
+    entry; the schema is served from memory and, at most every
+    `registered_schema_check_interval` seconds, the user_databases row is read
+    again (so every worker notices deleted rows and changed credentials) and the
+    schema version re-checked.
+    """
+    def __init__(self, max_databases: int):
+        self.max_databases = max_databases
+        self._databases: "OrderedDict[UUID, RegisteredDatabase]" = OrderedDict()
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+        self._schema_cache = SchemaCacheDAL()
+
+    def invalidate(self, db_id: UUID, user_id: str) -> Optional[RegisteredDatabase]:
+        """
+        Forget a user's registered database (e.g. after its credentials changed).
+        Returns the entry if it was loaded.
+        """
+        database = self._databases.get(db_id)
+        if database is None or database.user_id != str(user_id):
+            return None
+        self._locks.pop(db_id, None)
+        return self._databases.pop(db_id, None)
+
+    def _store(self, database: RegisteredDatabase) -> None:
+        self._databases[database.db_id] = database
+        self._databases.move_to_end(database.db_id)
+        while len(self._databases) > self.max_databases:
+            old_id, _ = self._databases.popitem(last=False)
+            self._locks.pop(old_id, None)
+
+    async def _sync_schema(self, db_session: AsyncSession, database: RegisteredDatabase) -> None:
+        """
+        Reload the schema through the shared schema cache (re-reflecting only when its
+        version changed) and record the sync on the user_databases row.
+        """
+        try:
+            sql_tools = await database.sql_tools()
+            database.db_schema = await self._schema_cache.get_schema(sql_tools, database.db_url)
+        except Exception:
+            await UserDatabaseDAL(db_session).update_sync_status(database.db_id, "failed")
+            raise
+        database.schema_checked_at = time.monotonic()
+        await UserDatabaseDAL(db_session).update_sync_status(database.db_id, "connected")
+
+    async def get(self, db_session: AsyncSession, db_id: UUID, user_id: str) -> Optional[RegisteredDatabase]:
+        """
+        Return a user's registered database with a current schema, or None if the
+        user has no database with this id.
+        """
+        user_id = str(user_id)
+        database = self._databases.get(db_id)
+        if database is not None and database.user_id == user_id and database.schema_is_fresh():
+            self._databases.move_to_end(db_id)
+            return database
+        async with self._locks.setdefault(db_id, asyncio.Lock()):
+            database = self._databases.get(db_id)
+            if database is not None and database.user_id == user_id and database.schema_is_fresh():
+                # Checked by another request while this one waited
+                return database
+            user_database = await UserDatabaseDAL(db_session).get_user_database(db_id, user_id)
+            if user_database is None:
+                if database is not None and database.user_id == user_id:
+                    # Deleted since it was loaded
+                    self._databases.pop(db_id, None)
+                return None
+            credentials = registered_credentials(user_database)
+            if database is None or database.user_id != user_id or database.credentials != credentials:
+                database = RegisteredDatabase(db_id, user_id, registered_db_url(user_database), credentials)
+                self._store(database)
+            try:
+                await self._sync_schema(db_session, database)
+            except Exception:
+                # Do not keep serving a schema (or URL) that can no longer be loaded
+                self._databases.pop(db_id, None)
+                raise
+            self._databases.move_to_end(db_id)
+            return database
+
+database_registry = DatabaseRegistryDAL(max_databases=settings.registered_database_cache_size)
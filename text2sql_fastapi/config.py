@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
 import os
+from typing import Dict
 
 """
 Configuration module for environment variables and application settings using Pydantic.
@@ -55,6 +56,100 @@ class Settings(BaseSettings):
     default_model_id: str = "eleven_flash_v2_5"
     default_output_format: str = "mp3_44100_128"
 
+    # Customer database engine pool
+    sql_engine_cache_size: int = 32
+    sql_engine_pool_size: int = 5
+    sql_engine_max_overflow: int = 5
+    sql_engine_pool_timeout: int = 30
+    sql_engine_pool_recycle: int = 1800
+    sql_engine_idle_timeout: int = 900
+    sql_thread_pool_size: int = 8
+
+    # Customer schema cache (seconds)
+    schema_cache_ttl: int = 604800
+    schema_cache_unprobed_ttl: int = 600
+
+    # Prompt schema pruning
+    schema_prune_top_k: int = 8
+    schema_prune_token_budget: int = 4000
+    schema_prune_min_tables: int = 15
+
+    # Prompt tool retrieval
+    tool_retrieval_top_k: int = 5
+    tool_registry_ttl: int = 300
+    # Longest wait between attempts to re-establish the tool change LISTEN connection (s)
+    tool_listener_max_backoff: float = 60.0
+
+    # Generated SQL cache
+    sql_cache_ttl: int = 86400
+    sql_cache_max_entries: int = 10000
+
+    # Near-duplicate prompt matching: prompts with the same numbers, negation/time words
+    # and "by" terms, differing only in schema names, reuse SQL when the Jaccard similarity
+    # of their normalized terms reaches the threshold (0 disables). At 0.8 one extra term
+    # is tolerated next to four or more shared ones ("top 3 selling products last month"
+    # vs "last month's 3 best sellers" scores 0.83), never next to three or fewer
+    near_duplicate_threshold: float = 0.8
+    near_duplicate_max_fingerprints: int = 256
+    near_duplicate_max_prompts: int = 500
+
+    # Query result cache (per-tool "result_cache_ttl" in tool_config overrides; 0 disables)
+    result_cache_ttl: int = 30
+    result_cache_max_bytes: int = 67108864
+    result_cache_max_entry_bytes: int = 1048576
+
+    # Shared LLM models and pooled agents (per worker)
+    llm_model_id: str = "gemini-2.0-flash"
+    llm_agent_pool_size: int = 8
+
+    # LLM calls allowed per /chat request for planning, generation and repairs (refine excluded)
+    query_llm_budget: int = 3
+
+    # Default /chat answer mode: raw, template or llm
+    default_answer_mode: str = "llm"
+
+    # Token budget for the SQL result embedded in the refine prompt
+    refine_result_max_tokens: int = 1500
+
+    # Summarize results with more rows than this for the refine step, fetching up to max rows (0 disables)
+    result_summary_min_rows: int = 0
+    result_summary_max_rows: int = 10000
+
+    # Rows fetched per server-side cursor batch by /export
+    export_batch_size: int = 1000
+
+    # Lifetime of /next continuation tokens, in seconds
+    continuation_token_ttl: int = 3600
+
+    # LLM gateway concurrency (per worker)
+    llm_max_concurrency: int = 64
+    llm_tenant_max_concurrency: int = 8
+    llm_acquire_timeout: float = 30.0
+
+    # Statement timeout for customer queries, in ms (plan name -> ms overrides; 0 disables)
+    query_statement_timeout_ms: int = 15000
+    query_plan_statement_timeouts_ms: Dict[str, int] = {}
+
+    # Pre-flight EXPLAIN cost guard: estimated rows / planner cost allowed per query
+    # (0 disables; plan name -> {"rows": ..., "cost": ...} overrides) and what happens
+    # to a query over budget: "reject", "limit" (fetch fewer rows) or "queue" (heavy queue)
+    query_max_estimated_rows: float = 0
+    query_max_estimated_cost: float = 0
+    query_plan_cost_budgets: Dict[str, Dict[str, float]] = {}
+    query_cost_action: str = "queue"
+
+    # Over-budget queries running at once per worker, and how long one waits for a slot (s)
+    heavy_query_concurrency: int = 2
+    heavy_query_acquire_timeout: float = 30.0
+
+    # Fernet key for user_databases.password_encrypted
+    database_encryption_key: str = ""
+
+    # Registered databases (db_id mode) kept decrypted with a warm engine and schema per
+    # worker, and how often their schema version is re-checked, in seconds
+    registered_database_cache_size: int = 256
+    registered_schema_check_interval: int = 60
+
     model_config = SettingsConfigDict(env_file=DOTENV_PATH, extra="allow")
 
 # Instantiate the settings
@@ -0,0 +1,704 @@
+import asyncio
+import contextlib
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from DAL_files.plan_dal import PlanDAL
+from DAL_files.result_cache_dal import CacheStatus, ResultCacheDAL, tool_result_ttl
+from DAL_files.schema_cache_dal import SchemaCacheDAL
+from DAL_files.sql_cache_dal import SQLCacheDAL
+from DAL_files.tool_registry_dal import ToolSet, tool_registry
+from DAL_files.user_database_dal import RegisteredDatabase, database_registry
+from schemas.tool_schemas import ToolInDB
+from tools.answer_templates import template_answer
+from tools.arrow_export import encode_columnar
+from tools.async_sql import AsyncSQLTools
+from tools.cost_guard import CostBudget, HeavyQueryBusyError, heavy_query_queue
+from tools.keyset import encode_continuation, plan_keyset
+from tools.llm_gateway import LLMBusyError, llm_gateway
+from tools.model_registry import PooledAgent, model_registry
+from tools.query_result import QueryResult
+from tools.result_encoder import encode_result, encode_rows
+from tools.result_summary import format_summary, summarize_result
+from tools.schema_index import select_prompt_tables
+from tools.schema_reflector import DatabaseSchema
+from tools.sql_validator import query_limit, validate_sql
+
+"""
+Text-to-SQL pipeline behind /chat: plan (tool match), generate, validate, execute
+and answer, run as one state machine with a hard LLM budget per request.
+"""
+
+schema_cache_service = SchemaCacheDAL()
+sql_cache_service = SQLCacheDAL()
+result_cache_service = ResultCacheDAL()
+
+STAGES = ("plan", "generate", "validate", "explain", "execute", "summarize", "refine")
+
+# Rows returned to the client (and fetched unless large results are summarized)
+RESULT_ROWS = 10
+
+
+class SQLParam(BaseModel):
+    name: str
+    value: str
+
+
+class SQLPlan(BaseModel):
+    """
+    Structured LLM output of the plan and generate stages.
+    """
+    used_tool: Optional[str] = None
+    sql_query: Optional[str] = None
+    params: Optional[List[SQLParam]] = None
+
+    def params_dict(self) -> Optional[Dict[str, str]]:
+        return {param.name: param.value for param in self.params} if self.params else None
+
+
+class PipelineMetrics:
+    """
+    Per-worker attempt, failure and latency counters for each pipeline stage.
+    """
+    def __init__(self):
+        self._stages = {stage: {"attempts": 0, "failures": 0, "total_ms": 0.0} for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, elapsed: float, ok: bool) -> None:
+        with self._lock:
+            counters = self._stages[stage]
+            counters["attempts"] += 1
+            counters["total_ms"] += elapsed * 1000
+            if not ok:
+                counters["failures"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                stage: {
+                    "attempts": counters["attempts"],
+                    "failures": counters["failures"],
+                    "avg_ms": round(counters["total_ms"] / counters["attempts"], 1) if counters["attempts"] else None,
+                }
+                for stage, counters in self._stages.items()
+            }
+
+
+pipeline_metrics = PipelineMetrics()
+
+
+def pruned_schema_prompt(db_schema: DatabaseSchema, prompt: str) -> str:
+    """
+    Schema text limited to the tables relevant to the prompt.
+    """
+    return db_schema.to_prompt(select_prompt_tables(
+        db_schema,
+        prompt,
+        top_k=settings.schema_prune_top_k,
+        token_budget=settings.schema_prune_token_budget,
+        min_tables=settings.schema_prune_min_tables,
+    ))
+
+def format_tool_list(matched_tools: List[Tuple[ToolInDB, float]]) -> str:
+    return "\n\n".join([
+        f"Tool {i+1}:\nName: {t.name}\nDescription: {t.description}\nSQL Template: {t.sql_template}"
+        for i, (t, _) in enumerate(matched_tools)
+    ])
+
+def build_tool_prompt(tool_list_str: str, schema_str: str, user_prompt: str) -> str:
+    return (
+        "You are a highly skilled AI SQL assistant designed to translate natural language queries into accurate SQL queries.\n\n"
+        "You have access to a set of tools. Each tool includes:\n"
+        "- name: The tool's unique name\n"
+        "- description: What the tool is designed to do\n"
+        "- sql_template: A SQL statement containing placeholders in curly braces that must be filled with values derived from the user query or schema.\n\n"
+        f"Available Tools:\n{tool_list_str}\n\n"
+        f"Database Schema:\n{schema_str}\n\n"
+        f"User Query:\n\"{user_prompt}\"\n\n"
+        "Instructions:\n"
+        "1. Analyze the user query carefully and match it to the most appropriate tool based on the tool descriptions.\n"
+        "   - If no tool is suitable, return 'used_tool': null.\n"
+        "2.MOST IMPORTANT - **Identify the correct tables and columns referenced in the query.**\n"
+        "   - Match them to the database schema, accounting for case sensitivity (table and column names must exactly match schema definitions).\n"
+        "   - Ensure you use proper table names and correct capitalization as shown in the schema.\n"
+        "3. Extract values for all placeholders in the selected tool's SQL template based on the user query and schema.\n"
+        "4. Fill the SQL template with the extracted values.\n\n"
+        "Respond ONLY in JSON with used_tool (tool name or null), sql_query (completed SQL query or null) "
+        "and params (list of extracted placeholder name/value pairs, or null)."
+    )
+
+def build_generate_prompt(schema_str: str, user_prompt: str, feedback: Optional[Tuple[Optional[str], str]] = None) -> str:
+    previous = ""
+    if feedback is not None:
+        failed_sql, problem = feedback
+        previous = (
+            "A previous attempt failed:\n"
+            f"SQL: {failed_sql or '(none)'}\n"
+            f"Problem: {problem}\n"
+            "Fix the problem in the new query.\n\n"
+        )
+    return (
+        f"Database schema:\n{schema_str}\n\n"
+        f"User question: {user_prompt}\n\n"
+        f"{previous}"
+        "Generate a single SELECT SQL query that answers this question. The query must:\n"
+        "1. Start with SELECT (or WITH)\n"
+        "2. Use only tables and columns from the schema above, with their exact capitalization\n"
+        "3. Be a valid SQL statement\n\n"
+        "Respond ONLY in JSON with used_tool set to null and sql_query set to the SQL query."
+    )
+
+def local_answer(answer_mode: Optional[str], query_result: QueryResult, truncated: bool = False) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Answer without the refine LLM call when the answer mode allows it.
+    Returns `(answer_source, answer)`; answer_source is None when the LLM must refine.
+    `query_result` holds the rows returned to the client and `truncated` marks
+    that more rows exist beyond them.
+    """
+    answer_mode = answer_mode or settings.default_answer_mode
+    if answer_mode == "raw":
+        return "raw", None
+    if answer_mode == "template":
+        answer = template_answer(query_result, truncated)
+        if answer is not None:
+            return "template", answer
+    return None, None
+
+async def run_llm(agent: PooledAgent, user_id: str, prompt: str, **kwargs):
+    """
+    `agent.run` through the LLM gateway, so the event loop is never blocked.
+    """
+    try:
+        return await llm_gateway.run(agent, prompt, tenant=user_id, **kwargs)
+    except LLMBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+def total_tokens(response: Any) -> Optional[int]:
+    """
+    Total tokens of an agno run response, across agno's usage attribute names.
+    """
+    usage = getattr(response, "response_usage", None) or getattr(response, "usage", None) or getattr(response, "metrics", None)
+    if isinstance(usage, dict):
+        total = usage.get("total_tokens")
+    else:
+        total = getattr(usage, "total_tokens", None)
+    # Older agno releases keep one entry per model call
+    if isinstance(total, list):
+        total = sum(value for value in total if isinstance(value, int))
+    return total if isinstance(total, int) else None
+
+def parse_plan(content: Optional[str]) -> Optional[SQLPlan]:
+    """
+    Parse schema-constrained output, tolerating a stray markdown fence.
+    """
+    if not content:
+        return None
+    content = re.sub(r"^```(?:json)?\s*|\s*```$", "", content.strip(), flags=re.IGNORECASE)
+    try:
+        return SQLPlan.model_validate_json(content)
+    except ValidationError:
+        pass
+    match = re.search(r"\{.*\}", content, re.DOTALL)
+    if match:
+        try:
+            return SQLPlan.model_validate_json(match.group(0))
+        except ValidationError:
+            return None
+    return None
+
+
+async def plan_statement_timeout(db: AsyncSession, user_id: str) -> int:
+    """
+    Statement timeout (ms) for a user's customer queries, by subscription plan name.
+    """
+    overrides = settings.query_plan_statement_timeouts_ms
+    if not overrides:
+        return settings.query_statement_timeout_ms
+    plan = await PlanDAL(db).get_user_plan(user_id)
+    if plan is None:
+        return settings.query_statement_timeout_ms
+    return overrides.get(plan.name, settings.query_statement_timeout_ms)
+
+
+async def plan_cost_budget(db: AsyncSession, user_id: str) -> CostBudget:
+    """
+    Pre-flight cost budget for a user's customer queries, by subscription plan name.
+    """
+    max_rows, max_cost = settings.query_max_estimated_rows, settings.query_max_estimated_cost
+    overrides = settings.query_plan_cost_budgets
+    if overrides:
+        plan = await PlanDAL(db).get_user_plan(user_id)
+        if plan is not None and plan.name in overrides:
+            max_rows = overrides[plan.name].get("rows", max_rows)
+            max_cost = overrides[plan.name].get("cost", max_cost)
+    return CostBudget(max_rows, max_cost, settings.query_cost_action)
+
+
+async def open_registered_database(db: AsyncSession, user_id: str, db_id: UUID) -> RegisteredDatabase:
+    """
+    A user's registered database, decrypted and with its schema, from the worker's registry.
+    """
+    database = await database_registry.get(db, db_id, user_id)
+    if database is None:
+        raise HTTPException(status_code=404, detail="Database not found")
+    return database
+
+
+async def prepare_saved_query(
+    db: AsyncSession,
+    user_id: str,
+    db_url: str,
+    prompt: Optional[str] = None,
+    sql: Optional[str] = None,
+    database: Optional[RegisteredDatabase] = None,
+) -> Tuple[AsyncSQLTools, DatabaseSchema, str]:
+    """
+    Open a customer database (`database` when registered, else `db_url`) and return
+    previously generated SQL, validated against its current schema: `sql` as
+    returned by /chat, else the SQL cached for `prompt`. No LLM call is made.
+    """
+    if sql is None and not prompt:
+        raise HTTPException(status_code=400, detail="Either sql or prompt is required")
+    statement_timeout_ms = await plan_statement_timeout(db, user_id)
+    if database is not None:
+        sql_tools, db_schema = await database.sql_tools(statement_timeout_ms), database.db_schema
+    else:
+        sql_tools = await AsyncSQLTools.from_url(db_url, statement_timeout_ms=statement_timeout_ms)
+        db_schema = await schema_cache_service.get_schema(sql_tools, db_url)
+    if sql is None:
+        tool_set = await tool_registry.get_tool_set(db)
+        cached_sql = await sql_cache_service.get(db_schema.fingerprint, prompt, tool_set.version)
+        if cached_sql is None:
+            raise HTTPException(status_code=404, detail="No generated SQL for this prompt, run /chat first")
+        sql = cached_sql["sql_query"]
+    validation = validate_sql(sql, db_schema)
+    if validation.problem is not None:
+        raise HTTPException(status_code=400, detail=validation.problem)
+    return sql_tools, db_schema, validation.sql
+
+
+class QueryPipeline:
+    """
+    One /chat request as a bounded state machine:
+
+        plan -> validate -> execute          (tool matched, or SQL cache hit)
+        plan -> generate -> validate -> ...  (no tool matched)
+        validate/execute failure -> generate (repair with the failure as feedback)
+        explain -> execute/generate          (cost guard, when a budget is set)
+        execute -> summarize                 (large results, when enabled)
+
+    Every LLM call of the plan and generate stages spends one unit of
+    `query_llm_budget`; the refine call happens at most once, after execution.
+    """
+    def __init__(
+        self,
+        prompt: str,
+        db_url: str,
+        user_id: str,
+        tool_set: ToolSet,
+        answer_mode: Optional[str] = None,
+        budget: Optional[int] = None,
+        statement_timeout_ms: Optional[int] = None,
+        cost_budget: Optional[CostBudget] = None,
+        database: Optional[RegisteredDatabase] = None,
+    ):
+        self.prompt = prompt
+        # A registered database brings its own URL, warm engine and schema
+        self.database = database
+        self.db_url = database.db_url if database is not None else db_url
+        self.user_id = user_id
+        self.tool_set = tool_set
+        self.answer_mode = answer_mode
+        self.budget = budget or settings.query_llm_budget
+        self.statement_timeout_ms = statement_timeout_ms if statement_timeout_ms is not None else settings.query_statement_timeout_ms
+        self.cost_budget = cost_budget or CostBudget(
+            settings.query_max_estimated_rows, settings.query_max_estimated_cost, settings.query_cost_action,
+        )
+        self.agent = model_registry.agent()
+        self.planner = model_registry.agent(json_schema=SQLPlan)
+
+        self.llm_calls = 0
+        self.attempts = {stage: 0 for stage in STAGES}
+        self.timings = {stage: 0.0 for stage in STAGES}
+        self.token_usage: Optional[Dict[str, int]] = None
+        self.refine_token_usage: Optional[Dict[str, int]] = None
+
+        self.tool_scores: List[Dict[str, Any]] = []
+        self.cache_hit = False
+        self.near_duplicate = None
+        self.used_tool: Optional[str] = None
+        self.db_schema: Optional[DatabaseSchema] = None
+        self.sql_query: Optional[str] = None
+        self.sql_repairs: List[str] = []
+        self.params: Optional[Dict[str, Any]] = None
+        self.query_result: Optional[QueryResult] = None
+        # Row limit the query was run with
+        self.result_limit: Optional[int] = None
+        self.result_cache = CacheStatus("BYPASS")
+        self.cost_estimate = None
+        # ok, limited, queued or rejected, once the cost guard has run
+        self.cost_action: Optional[str] = None
+        self.result_summary: Optional[Dict[str, Any]] = None
+        self.answer_source: Optional[str] = None
+        self.refined_answer: Optional[str] = None
+
+    def _record(self, stage: str, started: float, ok: bool) -> None:
+        elapsed = time.monotonic() - started
+        self.attempts[stage] += 1
+        self.timings[stage] += elapsed
+        pipeline_metrics.record(stage, elapsed, ok)
+
+    def _add_tokens(self, response: Any) -> None:
+        tokens = total_tokens(response)
+        if tokens is not None:
+            self.token_usage = {"total_tokens": (self.token_usage or {}).get("total_tokens", 0) + tokens}
+
+    async def _ask(self, stage: str, prompt: str) -> Optional[SQLPlan]:
+        self.llm_calls += 1
+        started = time.monotonic()
+        try:
+            response = await run_llm(self.planner, self.user_id, prompt)
+        except Exception:
+            self._record(stage, started, False)
+            raise
+        self._add_tokens(response)
+        plan = parse_plan(getattr(response, "content", None))
+        self._record(stage, started, plan is not None)
+        return plan
+
+    def _validate(self, sql: Any) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Return `(sql, None)` for an executable statement, or `(sql, problem)`.
+        Identifier case is repaired against the cached schema where possible.
+        """
+        started = time.monotonic()
+        if not isinstance(sql, str) or not sql.strip():
+            self._record("validate", started, False)
+            return None, "No SQL query was returned."
+        validation = validate_sql(sql, self.db_schema)
+        self.sql_repairs = validation.repairs
+        self._record("validate", started, validation.problem is None)
+        return validation.sql, validation.problem
+
+    async def run(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Drive the pipeline up to the query result, yielding `tool`, `sql` and `rows`
+        events as stages complete.
+        """
+        if self.database is not None:
+            sql_tools = await self.database.sql_tools(self.statement_timeout_ms)
+            db_schema = self.db_schema = self.database.db_schema
+        else:
+            sql_tools = await AsyncSQLTools.from_url(self.db_url, statement_timeout_ms=self.statement_timeout_ms)
+            db_schema = self.db_schema = await schema_cache_service.get_schema(sql_tools, self.db_url)
+        schema_str = pruned_schema_prompt(db_schema, self.prompt)
+        matched_tools = self.tool_set.index.search(self.prompt, top_k=settings.tool_retrieval_top_k)
+        self.tool_scores = [{"name": t.name, "score": round(score, 4)} for t, score in matched_tools]
+
+        # Reuse SQL already validated for this prompt (or a near-duplicate), schema and tool set
+        cached_sql = await sql_cache_service.get(db_schema.fingerprint, self.prompt, self.tool_set.version)
+        self.cache_hit = cached_sql is not None
+        if not self.cache_hit:
+            self.near_duplicate = await sql_cache_service.find_similar(db_schema, self.prompt, self.tool_set.version)
+            if self.near_duplicate is not None:
+                cached_sql = self.near_duplicate.entry
+
+        state = "plan"
+        candidate: Optional[str] = None
+        feedback: Optional[Tuple[Optional[str], str]] = None
+        if cached_sql is not None:
+            self.used_tool, candidate, self.params = cached_sql["used_tool"], cached_sql["sql_query"], cached_sql.get("params")
+            state = "validate"
+            yield "tool", self._tool_event()
+
+        while True:
+            if state == "plan":
+                plan = None
+                if self.llm_calls < self.budget:
+                    plan = await self._ask("plan", build_tool_prompt(format_tool_list(matched_tools), schema_str, self.prompt))
+                if plan is not None and plan.sql_query and self.tool_set.get(plan.used_tool) is not None:
+                    self.used_tool, candidate, self.params = plan.used_tool, plan.sql_query, plan.params_dict()
+                    state = "validate"
+                else:
+                    state = "generate"
+                yield "tool", self._tool_event()
+
+            elif state == "generate":
+                if self.cache_hit or self.near_duplicate is not None:
+                    # The cached SQL failed: forget it so repeats of the prompt do not fail again,
+                    # and let the SQL generated instead be cached for this prompt
+                    cached_prompt = self.near_duplicate.prompt if self.near_duplicate is not None else self.prompt
+                    await sql_cache_service.discard(db_schema.fingerprint, cached_prompt, self.tool_set.version)
+                    self.cache_hit, self.near_duplicate = False, None
+                if self.llm_calls >= self.budget:
+                    if feedback is not None:
+                        # Report why the last attempt failed (validation or execution), not an earlier error
+                        raise HTTPException(status_code=400, detail=f"Error processing your request: {feedback[1]}")
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Unable to generate a SELECT query for your request. Please rephrase your question to be more specific about what data you want to retrieve."
+                    )
+                # The first attempt sees the pruned schema; repairs escalate to the full schema
+                prompt = build_generate_prompt(db_schema.to_prompt() if feedback else schema_str, self.prompt, feedback)
+                plan = await self._ask("generate", prompt)
+                self.used_tool, self.params = None, None
+                candidate = plan.sql_query if plan is not None else None
+                if plan is None:
+                    feedback = (None, "The response was not valid JSON.")
+                    continue
+                state = "validate"
+
+            elif state == "validate":
+                candidate, problem = self._validate(candidate)
+                if problem is not None:
+                    feedback = (candidate, problem)
+                    state = "generate"
+                    continue
+                self.sql_query = candidate
+                yield "sql", {
+                    "sql_query": self.sql_query,
+                    "params": self.params,
+                    "sql_repairs": self.sql_repairs,
+                    "attempt": self.llm_calls,
+                }
+                state = "execute"
+
+            elif state == "execute":
+                limit = settings.result_summary_max_rows if settings.result_summary_min_rows else RESULT_ROWS
+                limit, problem = await self._check_cost(sql_tools, limit)
+                if problem is not None:
+                    if self.llm_calls >= self.budget:
+                        raise HTTPException(status_code=422, detail=problem)
+                    # Ask for a cheaper query (more selective filters, aggregation)
+                    feedback = (self.sql_query, problem)
+                    state = "generate"
+                    continue
+                self.result_limit = limit
+                started = time.monotonic()
+                try:
+                    async with heavy_query_queue.slot() if self.cost_action == "queued" else contextlib.nullcontext():
+                        self.query_result, self.result_cache = await result_cache_service.run_query(
+                            sql_tools, db_schema.fingerprint, self.sql_query, tool_result_ttl(self.tool_set.get(self.used_tool)),
+                            limit=limit,
+                        )
+                except HeavyQueryBusyError as e:
+                    raise HTTPException(status_code=429, detail=str(e))
+                failed = not self.query_result.ok
+                self._record("execute", started, not failed)
+                if not failed:
+                    if not self.cache_hit:
+                        await sql_cache_service.store(
+                            db_schema.fingerprint, self.prompt, self.tool_set.version,
+                            self.sql_query, used_tool=self.used_tool, params=self.params,
+                        )
+                    await self._summarize()
+                    break
+                feedback = (self.sql_query, self.query_result.error)
+                state = "generate"
+
+        yield "rows", {
+            "result": self.result(),
+            "result_summary": self.result_summary,
+            "continuation_token": self.continuation_token(),
+            "cost_estimate": self.cost_report(),
+            "result_cache": self.result_cache.to_dict(),
+        }
+
+    async def _check_cost(self, sql_tools: AsyncSQLTools, limit: int) -> Tuple[int, Optional[str]]:
+        """
+        EXPLAIN the query against the plan's cost budget before it runs. Returns the
+        row limit to run it with, or a problem if it is rejected.
+        """
+        self.cost_estimate, self.cost_action = None, None
+        if not self.cost_budget.enabled:
+            return limit, None
+        started = time.monotonic()
+        self.cost_estimate = await sql_tools.explain_query(self.sql_query, limit=limit)
+        self._record("explain", started, self.cost_estimate is not None)
+        problem = self.cost_budget.exceeded(self.cost_estimate) if self.cost_estimate is not None else None
+        if problem is None:
+            self.cost_action = "ok"
+            return limit, None
+        if self.cost_budget.action == "queue":
+            self.cost_action = "queued"
+            return limit, None
+        if self.cost_budget.action == "limit":
+            # Fetch only the rows returned to the client, with the LIMIT pushed into the
+            # query so the database stops early; explained again unless it already was
+            estimate = self.cost_estimate
+            if limit > RESULT_ROWS:
+                started = time.monotonic()
+                estimate = await sql_tools.explain_query(self.sql_query, limit=RESULT_ROWS)
+                self._record("explain", started, estimate is not None)
+            if estimate is not None and self.cost_budget.exceeded(estimate) is None:
+                self.cost_estimate, self.cost_action = estimate, "limited"
+                return RESULT_ROWS, None
+        self.cost_action = "rejected"
+        return limit, problem
+
+    def cost_report(self) -> Optional[Dict[str, Any]]:
+        if self.cost_action is None:
+            return None
+        return {
+            **(self.cost_estimate.to_dict() if self.cost_estimate is not None else {}),
+            "budget": self.cost_budget.to_dict(),
+            "action": self.cost_action,
+        }
+
+    async def _summarize(self) -> None:
+        """
+        Summarize results larger than `result_summary_min_rows` for the refine step.
+        """
+        if not settings.result_summary_min_rows or len(self.query_result) <= settings.result_summary_min_rows:
+            return
+        started = time.monotonic()
+        self.result_summary = await asyncio.to_thread(summarize_result, self.query_result)
+        self._record("summarize", started, self.result_summary is not None)
+
+    async def execute(self) -> None:
+        """
+        Run the pipeline to the query result without consuming its events.
+        """
+        async for _ in self.run():
+            pass
+
+    def _tool_event(self) -> Dict[str, Any]:
+        return {
+            "used_tool": self.used_tool,
+            "tool_scores": self.tool_scores,
+            "cache_hit": self.cache_hit,
+            "near_duplicate": self.near_duplicate.to_dict() if self.near_duplicate else None,
+        }
+
+    def result(self) -> Any:
+        if not self.query_result.ok:
+            return self.query_result.error
+        return self.query_result.records(RESULT_ROWS)
+
+    def result_truncated(self) -> bool:
+        """
+        Whether the result stopped at the applied row limit, so more rows may exist.
+        A LIMIT of the query's own at or below it means the result is complete.
+        """
+        if self.query_result is None or not self.query_result.ok or not self.result_limit:
+            return False
+        if len(self.query_result) < self.result_limit:
+            return False
+        own_limit = query_limit(self.sql_query, self.db_schema.dialect if self.db_schema is not None else None)
+        return own_limit is None or own_limit > self.result_limit
+
+    def answer_page(self) -> Tuple[QueryResult, bool]:
+        """
+        The rows returned to the client, for answers rendered locally, and whether
+        more rows exist beyond them.
+        """
+        page = QueryResult(self.query_result.columns, self.query_result.rows[:RESULT_ROWS], self.query_result.error)
+        return page, len(self.query_result) > RESULT_ROWS or self.result_truncated()
+
+    def continuation_token(self) -> Optional[str]:
+        """
+        Token for `/next` when the returned page is full and the query's order
+        can be continued with a keyset predicate.
+        """
+        if self.query_result is None or not self.query_result.ok or self.db_schema is None:
+            return None
+        keyset = plan_keyset(self.sql_query, self.db_schema)
+        if keyset is None:
+            return None
+        page = self.query_result.rows[:RESULT_ROWS]
+        # A LIMIT in the query caps the rows served across all pages
+        remaining = keyset.limit - len(page) if keyset.limit else None
+        if len(page) < RESULT_ROWS or remaining == 0:
+            return None
+        last = keyset.key_values(self.query_result.columns, page[-1])
+        if last is None:
+            return None
+        return encode_continuation(self.user_id, self.db_url, self.db_schema.fingerprint, self.sql_query, last, remaining)
+
+    def columnar(self, export_format: str) -> bytes:
+        """
+        The returned rows as an Arrow IPC stream or Parquet file, with the SQL and
+        answer in the schema metadata.
+        """
+        rows = QueryResult(self.query_result.columns, self.query_result.rows[:RESULT_ROWS])
+        return encode_columnar(rows, export_format, {
+            "sql_query": self.sql_query,
+            "refined_answer": self.refined_answer,
+            "answer_source": self.answer_source,
+        })
+
+    def refine_prompt(self) -> str:
+        if self.result_summary is not None:
+            # The summary covers every row; the sample shows their shape
+            result_str = (
+                f"SQL Result summary (all rows):\n{format_summary(self.result_summary)}\n"
+                f"First rows (tab-separated, header first):\n"
+                f"{encode_rows(self.query_result.columns, self.query_result.rows[:RESULT_ROWS], settings.refine_result_max_tokens)}\n"
+            )
+        else:
+            result_str = f"SQL Result (tab-separated, header first):\n{encode_result(self.query_result, settings.refine_result_max_tokens)}\n"
+        return (
+            f"User Query: {self.prompt}\n"
+            f"SQL Query: {self.sql_query}\n"
+            f"{result_str}"
+            "\nPlease provide a clear, user-friendly answer to the user's query based on the SQL result above."
+        )
+
+    async def answer(self) -> None:
+        """
+        Phrase the result: locally when the answer mode allows it, else with one LLM call.
+        """
+        self.answer_source, self.refined_answer = local_answer(self.answer_mode, *self.answer_page())
+        if self.answer_source is not None:
+            return
+        started = time.monotonic()
+        try:
+            response = await run_llm(self.agent, self.user_id, self.refine_prompt())
+        except Exception:
+            self._record("refine", started, False)
+            raise
+        self._record("refine", started, True)
+        self.refined_answer = response.content.strip() if response and response.content else None
+        tokens = total_tokens(response)
+        self.refine_token_usage = {"total_tokens": tokens} if tokens is not None else None
+        self.answer_source = "llm"
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "budget": self.budget,
+            "llm_calls": self.llm_calls,
+            "statement_timeout_ms": self.statement_timeout_ms,
+            "attempts": self.attempts,
+            "timings_ms": {stage: round(elapsed * 1000, 1) for stage, elapsed in self.timings.items()},
+        }
+
+    def response(self) -> Dict[str, Any]:
+        total_token_usage = (self.token_usage or {}).get("total_tokens", 0) + (self.refine_token_usage or {}).get("total_tokens", 0)
+        return {
+            "used_tool": self.used_tool,
+            "sql_query": self.sql_query,
+            "sql_repairs": self.sql_repairs,
+            "result": self.result(),
+            "result_summary": self.result_summary,
+            "continuation_token": self.continuation_token(),
+            "cost_estimate": self.cost_report(),
+            "params": self.params,
+            "token_usage": self.token_usage,
+            "refine_token_usage": self.refine_token_usage,
+            "total_token_usage": total_token_usage,
+            "tool_scores": self.tool_scores,
+            "cache_hit": self.cache_hit,
+            "near_duplicate": self.near_duplicate.to_dict() if self.near_duplicate else None,
+            "result_cache": self.result_cache.to_dict(),
+            "pipeline": self.metrics(),
+            "answer_source": self.answer_source,
+            "refined_answer": self.refined_answer
+        }
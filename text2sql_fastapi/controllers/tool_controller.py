@@ -4,6 +4,7 @@ from typing import List, Dict, Any, Optional
 from models.tool import Tool
 from schemas.tool_schemas import ToolCreate, ToolResponse
 from database import get_session
+from DAL_files.tool_dal import ToolDAL
  # Assuming OpenAI for LLM, replace with your provider if needed
 import os
 from sqlalchemy import text, select
@@ -11,22 +12,17 @@ from sqlalchemy.ext.asyncio import create_async_engine
 
 tool_router = APIRouter()
 
-from agno.agent import Agent
-from agno.models.google import Gemini
+from tools.llm_gateway import LLMBusyError, llm_gateway
+from tools.model_registry import model_registry
 
-def generate_sql_template(name: str, description: str) -> str:
+async def generate_sql_template(name: str, description: str) -> str:
     prompt = (
         "You are an expert SQL assistant. Given the following tool name and description, "
         "write a parameterized SQL query template using curly braces for placeholders "
         "(e.g., {column}, {table}, {condition}). Only output the SQL template, nothing else.\n\n"
         f"Name: {name}\nDescription: {description}\nSQL Template:"
     )
-    model = Gemini(
-        id="gemini-2.0-flash", 
-        api_key=os.getenv("GEMINI_API_KEY")  # Or however you load your key
-    )
-    agent = Agent(model=model)
-    response = agent.run(prompt)
+    response = await llm_gateway.run(model_registry.agent(), prompt)
     if response and response.content:
         return response.content.strip()
     return ""
@@ -37,17 +33,21 @@ async def create_tool(tool: ToolCreate, db: AsyncSession = Depends(get_session))
     sql_template = tool.sql_template
     if not sql_template:
         # Generate SQL template using LLM if not provided
-        sql_template = generate_sql_template(tool.name, tool.description or "")
-    db_tool = Tool(
+        try:
+            sql_template = await generate_sql_template(tool.name, tool.description or "")
+        except LLMBusyError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+    # Go through ToolDAL so the cached tool registries of all workers are refreshed
+    tool_data = ToolCreate(
         name=tool.name,
         description=tool.description,
         tool_config=tool.tool_config,
         sql_template=sql_template
     )
-    db.add(db_tool)
-    await db.commit()
-    await db.refresh(db_tool)
-    return db_tool
+    try:
+        return await ToolDAL(db).create(tool_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @tool_router.get("/", response_model=List[ToolResponse])
 async def list_tools(db: AsyncSession = Depends(get_session)):
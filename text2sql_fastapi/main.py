@@ -22,6 +22,11 @@ from controllers.plan_controller import plan_router
 from middleware import register_middleware
 from contextlib import asynccontextmanager
 from database import init_db
+from tools.engine_registry import engine_registry, async_engine_registry
+from DAL_files.tool_registry_dal import tool_registry
+from tools.llm_gateway import llm_gateway
+from tools.model_registry import model_registry
+from controllers.query_pipeline import SQLPlan
 import yaml
 
 from controllers.invoice_controller import invoice_router
@@ -36,11 +41,20 @@ load_dotenv()
 @asynccontextmanager
 async def life_span(app:FastAPI):
     """
-    Application lifespan event handler. Initializes the database on startup.
+    Application lifespan event handler. Initializes the database, the tool change
+    listener and the shared LLM models on startup, and disposes pooled customer
+    database engines, the LLM gateway's threads and the models on shutdown.
     """
     print("server starting...")
     await init_db()
+    await tool_registry.start_listener()
+    model_registry.warm_up(json_schemas=(None, SQLPlan))
     yield
+    await tool_registry.stop_listener()
+    engine_registry.dispose_all()
+    await async_engine_registry.dispose_all()
+    llm_gateway.shutdown()
+    model_registry.close()
     print("server has been stopped")
 
 app = FastAPI(
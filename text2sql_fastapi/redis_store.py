@@ -1,11 +1,13 @@
 import redis.asyncio as aioredis
+import time
 from config import settings
 
 JIT_EXPIRY = 3600
 
 """
-Async Redis utility functions for JWT blocklist and prompt template storage.
-Handles token blacklisting and prompt template caching for user sessions.
+Async Redis utility functions for JWT blocklist, prompt template, schema and query caches.
+Handles token blacklisting, prompt template caching for user sessions, and
+reflected schemas and generated SQL shared by all workers.
 """
 
 # Create Redis connection
@@ -61,4 +63,127 @@ store = aioredis.Redis(
   host=settings.redis_host,
   port=settings.redis_port,
   password=settings.redis_password
-)
\ No newline at end of file
+)
+
+# Store a reflected customer schema shared by all workers
+async def store_cached_schema(db_key: str, schema_json: str, expiry: int):
+    """
+    Store a reflected database schema (JSON) in Redis for a database key.
+    """
+    await store.set(f"schema:{db_key}", schema_json, ex=expiry)
+
+# Get a reflected customer schema
+async def get_cached_schema(db_key: str) -> str:
+    """
+    Retrieve a reflected database schema (JSON) from Redis for a database key.
+    Returns None if not cached.
+    """
+    value = await store.get(f"schema:{db_key}")
+    if value is not None:
+        return value.decode("utf-8")
+    return None
+
+# Drop a reflected customer schema
+async def invalidate_cached_schema(db_key: str) -> bool:
+    """
+    Remove a cached database schema from Redis. Returns True if one was cached.
+    """
+    return bool(await store.delete(f"schema:{db_key}"))
+
+# Generated SQL cache, size-bounded by a recency index
+SQL_CACHE_INDEX = "sqlcache:index"
+
+async def get_cached_sql(key: str) -> str:
+    """
+    Retrieve cached generated SQL (JSON) and mark it recently used.
+    Returns None if not cached.
+    """
+    async with store.pipeline(transaction=False) as pipe:
+        pipe.get(f"sqlcache:{key}")
+        pipe.zadd(SQL_CACHE_INDEX, {key: time.time()}, xx=True)
+        value, _ = await pipe.execute()
+    if value is not None:
+        return value.decode("utf-8")
+    return None
+
+async def store_cached_sql(key: str, value: str, expiry: int, max_entries: int):
+    """
+    Store generated SQL (JSON), evicting the least recently used entries beyond max_entries.
+    """
+    async with store.pipeline(transaction=False) as pipe:
+        pipe.set(f"sqlcache:{key}", value, ex=expiry)
+        pipe.zadd(SQL_CACHE_INDEX, {key: time.time()})
+        pipe.zcard(SQL_CACHE_INDEX)
+        _, _, size = await pipe.execute()
+    if size > max_entries:
+        evicted = await store.zpopmin(SQL_CACHE_INDEX, size - max_entries)
+        if evicted:
+            await store.delete(*[f"sqlcache:{member.decode('utf-8')}" for member, _ in evicted])
+
+async def delete_cached_sql(key: str) -> bool:
+    """
+    Remove cached generated SQL. Returns True if it was cached.
+    """
+    async with store.pipeline(transaction=False) as pipe:
+        pipe.delete(f"sqlcache:{key}")
+        pipe.zrem(SQL_CACHE_INDEX, key)
+        deleted, _ = await pipe.execute()
+    return bool(deleted)
+
+# Hit/miss counters shared by all workers
+async def incr_cache_counter(cache: str, outcome: str):
+    """
+    Increment a cache's hit or miss counter.
+    """
+    await store.hincrby(f"cache_stats:{cache}", outcome, 1)
+
+async def get_cache_counters(cache: str) -> dict:
+    """
+    Return a cache's counters, e.g. {"hits": 10, "misses": 3}.
+    """
+    counters = await store.hgetall(f"cache_stats:{cache}")
+    return {name.decode("utf-8"): int(value) for name, value in counters.items()}
+
+# Query result cache, bounded by total bytes with least recently used eviction
+RESULT_CACHE_INDEX = "resultcache:index"
+RESULT_CACHE_SIZES = "resultcache:sizes"
+RESULT_CACHE_BYTES = "resultcache:bytes"
+
+async def get_cached_result(key: str) -> str:
+    """
+    Retrieve a cached query result (JSON) and mark it recently used.
+    Returns None if not cached.
+    """
+    async with store.pipeline(transaction=False) as pipe:
+        pipe.get(f"resultcache:{key}")
+        pipe.zadd(RESULT_CACHE_INDEX, {key: time.time()}, xx=True)
+        value, _ = await pipe.execute()
+    if value is not None:
+        return value.decode("utf-8")
+    return None
+
+async def store_cached_result(key: str, value: str, expiry: int, max_bytes: int):
+    """
+    Store a query result (JSON), evicting the least recently used results while
+    the cache holds more than max_bytes.
+    """
+    size = len(value.encode("utf-8"))
+    async with store.pipeline(transaction=False) as pipe:
+        pipe.hget(RESULT_CACHE_SIZES, key)
+        pipe.set(f"resultcache:{key}", value, ex=expiry)
+        pipe.zadd(RESULT_CACHE_INDEX, {key: time.time()})
+        pipe.hset(RESULT_CACHE_SIZES, key, size)
+        previous, _, _, _ = await pipe.execute()
+    total = await store.incrby(RESULT_CACHE_BYTES, size - int(previous or 0))
+    # Expired results keep their size until evicted here
+    while total > max_bytes:
+        evicted = await store.zpopmin(RESULT_CACHE_INDEX)
+        if not evicted:
+            break
+        members = [member.decode("utf-8") for member, _ in evicted]
+        async with store.pipeline(transaction=False) as pipe:
+            pipe.hmget(RESULT_CACHE_SIZES, members)
+            pipe.hdel(RESULT_CACHE_SIZES, *members)
+            pipe.delete(*[f"resultcache:{member}" for member in members])
+            sizes, _, _ = await pipe.execute()
+        total = await store.decrby(RESULT_CACHE_BYTES, sum(int(s or 0) for s in sizes))
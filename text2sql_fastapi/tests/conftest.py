@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sqlite3
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+"""
+Shared fixtures: placeholder settings so the app imports without a .env, an
+in-memory Redis, a scripted LLM and a small SQLite customer database.
+"""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for name in (
+    "DATABASE_HOSTNAME", "DATABASE_PASSWORD", "DATABASE_NAME", "DATABASE_USERNAME",
+    "JWT_SECRET", "REDIS_HOST", "REDIS_PASSWORD", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET",
+    "MAIL_USERNAME", "MAIL_PASSWORD", "MAIL_SERVER", "MAIL_FROM_NAME", "GROQ_API_KEY",
+    "UPSTASH_REDIS_REST_URL", "UPSTASH_REDIS_REST_TOKEN", "GEMINI_API_KEY", "ELEVENLABS_API_KEY",
+):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("DATABASE_PORT", "5432")
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("MAIL_PORT", "587")
+os.environ.setdefault("MAIL_FROM", "test@example.com")
+
+
+class ScriptedLLM:
+    """
+    Stands in for `run_llm`: answers with the queued replies, in order.
+    """
+    def __init__(self):
+        self.replies = []
+        self.prompts = []
+
+    async def __call__(self, agent, user_id, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return SimpleNamespace(content=self.replies.pop(0), metrics={})
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    import redis_store
+    monkeypatch.setattr(redis_store, "store", fakeredis.FakeAsyncRedis())
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    import controllers.query_pipeline as query_pipeline
+    scripted = ScriptedLLM()
+    monkeypatch.setattr(query_pipeline, "run_llm", scripted)
+    return scripted
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    path = tmp_path / "shop.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, sales INTEGER)")
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?)", [(i, f"product {i}", i * 10) for i in range(1, 31)])
+    conn.commit()
+    conn.close()
+    return f"sqlite:///{path}"
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
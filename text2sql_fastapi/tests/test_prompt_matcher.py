@@ -0,0 +1,53 @@
+from tools.prompt_matcher import PromptMatcher, schema_vocabulary
+
+THRESHOLD = 0.8
+VOCABULARY = schema_vocabulary(["products", "product_id", "name", "sales", "orders", "order_id", "customers", "customer_id", "region"])
+ENTRY = {"used_tool": None, "sql_query": "SELECT 1", "params": None}
+
+
+def matcher_with(*prompts):
+    matcher = PromptMatcher(max_entries=10)
+    for prompt in prompts:
+        matcher.add(prompt, ENTRY)
+    return matcher
+
+
+def test_reworded_prompt_matches():
+    matcher = matcher_with("top 3 selling products last month")
+    match = matcher.match("last month's 3 best sellers", THRESHOLD, VOCABULARY)
+    assert match is not None
+    assert match.prompt == "top 3 selling products last month"
+    assert match.similarity >= THRESHOLD
+
+
+def test_reordered_prompt_matches():
+    matcher = matcher_with("total sales by region")
+    assert matcher.match("by region, total sales", THRESHOLD, VOCABULARY) is not None
+
+
+def test_swapped_by_terms_do_not_match():
+    matcher = matcher_with("orders by customer")
+    assert matcher.match("customers by order", THRESHOLD, VOCABULARY) is None
+
+
+def test_guard_words_and_numbers_must_match():
+    matcher = matcher_with("top 3 selling products last month", "customers who ordered")
+    assert matcher.match("top 3 selling products this month", THRESHOLD, VOCABULARY) is None
+    assert matcher.match("top 5 selling products last month", THRESHOLD, VOCABULARY) is None
+    assert matcher.match("customers who never ordered", THRESHOLD, VOCABULARY) is None
+
+
+def test_extra_filter_value_does_not_match():
+    matcher = matcher_with("top 3 products by sales last month")
+    assert matcher.match("top 3 products by sales last month in canada", THRESHOLD, VOCABULARY) is None
+
+
+def test_different_entities_do_not_match():
+    matcher = matcher_with("top 3 products by sales")
+    assert matcher.match("top 3 customers by sales", THRESHOLD, VOCABULARY) is None
+
+
+def test_removed_prompt_no_longer_matches():
+    matcher = matcher_with("top 3 selling products last month")
+    matcher.remove("top 3 selling products last month")
+    assert matcher.match("last month's 3 best sellers", THRESHOLD, VOCABULARY) is None
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from config import settings
+from conftest import run
+from controllers.query_pipeline import QueryPipeline, schema_cache_service, sql_cache_service
+from DAL_files.tool_registry_dal import ToolSet
+from tools.async_sql import AsyncSQLTools
+
+PROMPT = "total sales of all products"
+GOOD_SQL = "SELECT SUM(sales) AS total_sales FROM products"
+
+
+async def fingerprint(db_url):
+    sql_tools = await AsyncSQLTools.from_url(db_url)
+    return (await schema_cache_service.get_schema(sql_tools, db_url)).fingerprint
+
+
+async def answer(prompt, db_url, tool_set):
+    pipeline = QueryPipeline(prompt, db_url, "user-1", tool_set, "raw")
+    await pipeline.execute()
+    return pipeline
+
+
+def test_failed_cached_sql_is_replaced(db_url, llm):
+    tool_set = ToolSet([])
+
+    async def scenario():
+        key = await fingerprint(db_url)
+        await sql_cache_service.store(key, PROMPT, tool_set.version, "SELECT NOFUNC(sales) AS total_sales FROM products")
+        llm.replies = [json.dumps({"sql_query": GOOD_SQL})]
+        first = await answer(PROMPT, db_url, tool_set)
+        cached = await sql_cache_service.get(key, PROMPT, tool_set.version)
+        second = await answer(PROMPT, db_url, tool_set)
+        return first, cached, second
+
+    first, cached, second = run(scenario())
+    assert first.sql_query == GOOD_SQL
+    assert first.cache_hit is False and first.near_duplicate is None
+    assert first.response()["result"] == [{"total_sales": 4650}]
+    assert cached["sql_query"] == GOOD_SQL
+    # The repaired SQL is served from the cache without another LLM call
+    assert second.cache_hit is True and second.llm_calls == 0
+    assert len(llm.prompts) == 1
+
+
+def test_budget_exhausted_reports_last_failure(db_url, llm):
+    llm.replies = [
+        json.dumps({"used_tool": None}),
+        json.dumps({"sql_query": "SELECT NOFUNC(sales) FROM products"}),
+        json.dumps({"sql_query": "DELETE FROM products"}),
+    ]
+    pipeline = QueryPipeline(PROMPT, db_url, "user-1", ToolSet([]), "raw", budget=3)
+    with pytest.raises(HTTPException) as error:
+        run(pipeline.execute())
+    assert error.value.status_code == 400
+    assert error.value.detail == "Error processing your request: Only a single SELECT query is allowed."
+
+
+def test_reworded_prompt_reuses_sql_without_llm(db_url, llm):
+    tool_set = ToolSet([])
+    top_sql = "SELECT name FROM products ORDER BY sales DESC LIMIT 3"
+    llm.replies = [json.dumps({"used_tool": None}), json.dumps({"sql_query": top_sql})]
+
+    async def scenario():
+        first = await answer("top 3 selling products last month", db_url, tool_set)
+        second = await answer("last month's 3 best sellers", db_url, tool_set)
+        return first, second
+
+    first, second = run(scenario())
+    assert first.llm_calls == 2
+    assert second.llm_calls == 0 and second.sql_query == top_sql
+    assert second.response()["near_duplicate"]["matched_prompt"] == "top 3 selling products last month"
+
+
+def test_template_answer_lists_only_returned_rows(db_url, llm, monkeypatch):
+    # Summaries on: the query fetches up to 100 rows, the response returns 10
+    monkeypatch.setattr(settings, "result_summary_min_rows", 50)
+    monkeypatch.setattr(settings, "result_summary_max_rows", 100)
+    llm.replies = [json.dumps({"used_tool": None}), json.dumps({"sql_query": "SELECT name FROM products WHERE id <= 15 ORDER BY id"})]
+
+    async def scenario():
+        pipeline = QueryPipeline("names of the first 15 products", db_url, "user-1", ToolSet([]), "template")
+        await pipeline.execute()
+        await pipeline.answer()
+        return pipeline
+
+    pipeline = run(scenario())
+    returned = pipeline.response()["result"]
+    assert len(pipeline.query_result) == 15 and len(returned) == 10
+    lines = pipeline.refined_answer.splitlines()
+    assert lines[0] == "Name (first 10 results, more are available):"
+    assert lines[1:] == [f"- {row['name']}" for row in returned]
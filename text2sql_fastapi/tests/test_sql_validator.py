@@ -0,0 +1,58 @@
+import pytest
+
+from tools.schema_reflector import ColumnInfo, DatabaseSchema, TableInfo
+from tools.sql_validator import validate_sql
+
+SCHEMA = DatabaseSchema(
+    dialect="postgresql",
+    tables={
+        "orders": TableInfo(
+            name="orders",
+            columns=[ColumnInfo(name="id", type="INTEGER", nullable=False), ColumnInfo(name="total", type="NUMERIC")],
+            primary_key=["id"],
+        )
+    },
+)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT pg_sleep(10)",
+    "SELECT id FROM orders WHERE pg_sleep(1) IS NOT NULL",
+    "SELECT pg_catalog.pg_sleep(1)",
+    "SELECT pg_terminate_backend(42)",
+    "SELECT set_config('statement_timeout', '0', false)",
+    "SELECT lo_import('/etc/passwd')",
+    "SELECT * FROM dblink('host=evil', 'SELECT 1') AS t(a int)",
+    "SELECT query_to_xml('DELETE FROM orders', true, true, '')",
+    "SELECT nextval('orders_id_seq')",
+])
+def test_side_effecting_functions_are_rejected(sql):
+    assert validate_sql(sql, SCHEMA).problem.endswith("is not allowed.")
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT SLEEP(5)",
+    "SELECT BENCHMARK(1000000, MD5('a'))",
+    "SELECT LOAD_FILE('/etc/passwd')",
+])
+def test_mysql_side_effecting_functions_are_rejected(sql):
+    schema = SCHEMA.model_copy(update={"dialect": "mysql"})
+    assert validate_sql(sql, schema).problem.endswith("is not allowed.")
+
+
+def test_side_effecting_function_rejected_without_schema():
+    assert validate_sql("SELECT pg_sleep(10)").problem == "Function pg_sleep is not allowed."
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT id FROM orders FOR UPDATE",
+    "SELECT id INTO backup FROM orders",
+    "DELETE FROM orders",
+])
+def test_writes_and_locks_are_rejected(sql):
+    assert validate_sql(sql, SCHEMA).problem == "Only a single SELECT query is allowed."
+
+
+def test_ordinary_functions_are_allowed():
+    validation = validate_sql("SELECT COUNT(*), ROUND(SUM(total), 2), COALESCE(MAX(total), 0) FROM orders", SCHEMA)
+    assert validation.problem is None
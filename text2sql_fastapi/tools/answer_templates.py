@@ -0,0 +1,100 @@
+import json
+import math
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from tools.query_result import QueryResult
+
+"""
+Deterministic prose for simple SQL results, so common answers (a single number,
+a short list, a small top-N table) skip the refine LLM call.
+"""
+
+MAX_LIST_ROWS = 20
+MAX_TABLE_ROWS = 20
+MAX_TABLE_COLUMNS = 6
+MAX_CELL_CHARS = 80
+
+
+def _label(column: str) -> str:
+    return column.replace("_", " ").strip().capitalize() or column
+
+
+def format_value(value: Any) -> str:
+    """
+    Human-friendly rendering of one cell.
+    """
+    if value is None:
+        return "n/a"
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, Decimal):
+        value = float(value)
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return str(value)
+        if value.is_integer() and abs(value) < 1e15:
+            return f"{int(value):,}"
+        return f"{value:,.2f}"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, default=str)
+    text = " ".join(str(value).split())
+    if len(text) > MAX_CELL_CHARS:
+        text = text[:MAX_CELL_CHARS - 1] + "…"
+    return text
+
+
+def _is_scalar(value: Any) -> bool:
+    return not isinstance(value, (dict, list))
+
+
+def render_answer(rows: List[Dict[str, Any]], truncated: bool = False) -> Optional[str]:
+    """
+    Render simple result shapes locally. Returns None when the shape needs the LLM:
+    nested values, wide rows or more rows than a short answer can list. `truncated`
+    means the rows stopped at the applied row limit, so the answer says so.
+    """
+    if not rows:
+        return "No matching records were found."
+    columns = list(rows[0].keys())
+    if not columns or any(list(row.keys()) != columns for row in rows):
+        return None
+    if not all(_is_scalar(row[column]) for row in rows for column in columns):
+        return None
+
+    count = f"first {len(rows)} results, more are available" if truncated else f"{len(rows)} results"
+
+    if len(rows) == 1 and len(columns) == 1 and not truncated:
+        column = columns[0]
+        return f"{_label(column)}: {format_value(rows[0][column])}"
+
+    if len(rows) == 1 and len(columns) <= MAX_TABLE_COLUMNS and not truncated:
+        return "\n".join(f"- {_label(column)}: {format_value(rows[0][column])}" for column in columns)
+
+    if len(columns) == 1 and len(rows) <= MAX_LIST_ROWS:
+        column = columns[0]
+        items = "\n".join(f"- {format_value(row[column])}" for row in rows)
+        return f"{_label(column)} ({count}):\n{items}"
+
+    if len(rows) <= MAX_TABLE_ROWS and len(columns) <= MAX_TABLE_COLUMNS:
+        header = "| " + " | ".join(_label(column) for column in columns) + " |"
+        divider = "|" + "|".join(" --- " for _ in columns) + "|"
+        body = [
+            "| " + " | ".join(format_value(row[column]).replace("|", "\\|") for column in columns) + " |"
+            for row in rows
+        ]
+        return "\n".join([f"{count.capitalize()}:", header, divider, *body])
+
+    return None
+
+
+def template_answer(result: QueryResult, truncated: bool = False) -> Optional[str]:
+    """
+    Template answer for a query result, or None if the LLM should phrase it.
+    `truncated` marks a result cut off by the row limit rather than complete.
+    """
+    if not result.ok or len(result) > max(MAX_LIST_ROWS, MAX_TABLE_ROWS):
+        return None
+    return render_answer(result.records(), truncated)
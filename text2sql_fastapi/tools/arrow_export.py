@@ -0,0 +1,127 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # Optional: Arrow and Parquet responses are refused without pyarrow
+    pa = None
+
+from tools.query_result import QueryResult
+
+"""
+Columnar encodings of SQL results: Arrow IPC streams and Parquet files, built
+from row batches column by column (no per-row dicts) so analytics clients can
+load results without decoding JSON.
+"""
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+COLUMNAR_MEDIA_TYPES = {"arrow": ARROW_STREAM_MEDIA_TYPE, "parquet": PARQUET_MEDIA_TYPE}
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+def negotiate_columnar(accept: str) -> Optional[str]:
+    """
+    `arrow` or `parquet` when the Accept header asks for one, else None.
+    """
+    for name, media_type in COLUMNAR_MEDIA_TYPES.items():
+        if media_type in accept:
+            return name
+    return None
+
+
+class _Sink:
+    """
+    Write-only file object whose buffered bytes are drained after each batch.
+    """
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+class ColumnarEncoder:
+    """
+    Incremental Arrow IPC or Parquet encoder. The schema is inferred from the
+    first batch; `encode` returns the bytes ready to send after each batch and
+    `finish` the trailing bytes (Parquet footer, end-of-stream marker).
+    """
+    def __init__(self, columns: List[str], export_format: str, metadata: Optional[Dict[str, str]] = None):
+        if pa is None:
+            raise RuntimeError("pyarrow is not installed")
+        self.columns = columns
+        self.export_format = export_format
+        self.metadata = {key: value for key, value in (metadata or {}).items() if value is not None}
+        self.schema: Optional["pa.Schema"] = None
+        self._sink = _Sink()
+        self._writer = None
+
+    def _array(self, values: List[Any], type: Optional["pa.DataType"] = None) -> "pa.Array":
+        if type is not None and pa.types.is_string(type):
+            return pa.array([None if value is None else str(value) for value in values], type=type)
+        try:
+            array = pa.array(values, type=type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed or driver-specific values: keep them as text
+            return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+        if type is None and pa.types.is_null(array.type):
+            return pa.array(values, type=pa.string())
+        return array
+
+    def _open(self, arrays: List["pa.Array"]) -> None:
+        self.schema = pa.schema(
+            [pa.field(name, array.type) for name, array in zip(self.columns, arrays)],
+            metadata=self.metadata or None,
+        )
+        if self.export_format == "parquet":
+            self._writer = pq.ParquetWriter(self._sink, self.schema)
+        else:
+            self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        if self.schema is None:
+            arrays = [self._array([row[i] for row in rows]) for i in range(len(self.columns))]
+            self._open(arrays)
+        else:
+            arrays = []
+            for i, field in enumerate(self.schema):
+                array = self._array([row[i] for row in rows], field.type)
+                if array.type != field.type:
+                    # Later batches must match the types inferred from the first one
+                    array = array.cast(field.type)
+                arrays.append(array)
+        if rows:
+            self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        if self.schema is None:
+            self.encode([])
+        self._writer.close()
+        return self._sink.drain()
+
+
+def encode_columnar(result: QueryResult, export_format: str, metadata: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    Encode a whole query result as one Arrow IPC stream or Parquet file.
+    """
+    encoder = ColumnarEncoder(result.columns, export_format, metadata)
+    return encoder.encode(result.rows) + encoder.finish()
@@ -0,0 +1,374 @@
+import asyncio
+import functools
+import importlib.util
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from agno.tools import Toolkit
+from agno.utils.log import log_debug, logger
+
+try:
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+    from sqlalchemy.inspection import inspect
+    from sqlalchemy.sql.expression import text
+except ImportError:
+    raise ImportError("`sqlalchemy` not installed")
+
+from config import settings
+from tools.cost_guard import CostEstimate, explain_statement, parse_explain
+from tools.engine_registry import async_engine_registry
+from tools.query_result import QueryResult
+from tools.schema_reflector import DatabaseSchema, probe_schema_version, reflect_schema
+from tools.sql import SQLTools, statement_timeout_sql, with_statement_timeout
+from tools.sql_validator import push_down_limit
+from tools.streaming import iterate_in_thread
+
+"""
+Async counterpart of SQLTools so customer queries never block the event loop.
+Uses an async driver where the dialect has one and a bounded thread pool otherwise.
+"""
+
+# backend name -> (async driver name, module that must be importable)
+ASYNC_DRIVERS = {
+    "postgresql": ("asyncpg", "asyncpg"),
+    "sqlite": ("aiosqlite", "aiosqlite"),
+    "mysql": ("asyncmy", "asyncmy"),
+    "mariadb": ("asyncmy", "asyncmy"),
+}
+
+# Dedicated pool so slow customer queries cannot starve the default executor
+sql_executor = ThreadPoolExecutor(
+    max_workers=settings.sql_thread_pool_size,
+    thread_name_prefix="sql-tools",
+)
+
+
+def to_async_db_url(db_url: str) -> Optional[str]:
+    """
+    Rewrite a sync database URL to use the dialect's async driver.
+    Returns None if the dialect has no async driver installed.
+    """
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return None
+    driver, module = ASYNC_DRIVERS[backend]
+    if url.get_driver_name() == driver:
+        return db_url
+    if importlib.util.find_spec(module) is None:
+        return None
+    url = url.set(drivername=f"{backend}+{driver}")
+    # asyncpg takes `ssl` where libpq takes `sslmode`
+    if driver == "asyncpg" and "sslmode" in url.query:
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url.render_as_string(hide_password=False)
+
+
+class AsyncSQLTools(Toolkit):
+    """
+    Async toolkit for interacting with SQL databases: list tables, describe tables, and run SQL queries.
+    Either wraps a pooled AsyncEngine or delegates to a sync SQLTools on a thread pool.
+    """
+    def __init__(
+        self,
+        db_engine: Optional[AsyncEngine] = None,
+        sync_tools: Optional[SQLTools] = None,
+        schema: Optional[str] = None,
+        tables: Optional[Dict[str, Any]] = None,
+        list_tables: bool = True,
+        describe_table: bool = True,
+        run_sql_query: bool = True,
+        statement_timeout_ms: Optional[int] = None,
+        **kwargs,
+    ):
+        if db_engine is None and sync_tools is None:
+            raise ValueError("Could not build the database connection")
+
+        # Database connection
+        self.db_engine: Optional[AsyncEngine] = db_engine
+        self.sync_tools: Optional[SQLTools] = sync_tools
+        self.Session: Optional[async_sessionmaker[AsyncSession]] = (
+            async_sessionmaker(bind=db_engine, expire_on_commit=False) if db_engine is not None else None
+        )
+
+        self.schema = schema
+
+        # Per-statement time limit applied to every session that runs a query
+        self.statement_timeout_ms = statement_timeout_ms
+
+        # Tables this toolkit can access
+        self.tables: Optional[Dict[str, Any]] = tables
+
+        tools: List[Any] = []
+        if list_tables:
+            tools.append(self.list_tables)
+        if describe_table:
+            tools.append(self.describe_table)
+        if run_sql_query:
+            tools.append(self.run_sql_query)
+
+        super().__init__(name="sql_tools", tools=tools, **kwargs)
+
+    @classmethod
+    async def from_url(
+        cls,
+        db_url: str,
+        schema: Optional[str] = None,
+        statement_timeout_ms: Optional[int] = None,
+        **kwargs,
+    ) -> "AsyncSQLTools":
+        """
+        Build the toolkit for a database URL, preferring a pooled async engine
+        and falling back to the thread pool when no async driver is available.
+        """
+        async_url = to_async_db_url(db_url)
+        if async_url is not None:
+            db_engine = await async_engine_registry.get_engine(async_url)
+            return cls(db_engine=db_engine, schema=schema, statement_timeout_ms=statement_timeout_ms, **kwargs)
+        log_debug("No async driver for database, using thread pool fallback")
+        sync_tools = SQLTools(db_url=db_url, schema=schema, statement_timeout_ms=statement_timeout_ms)
+        return cls(sync_tools=sync_tools, schema=schema, statement_timeout_ms=statement_timeout_ms, **kwargs)
+
+    @property
+    def is_async(self) -> bool:
+        return self.db_engine is not None
+
+    async def _in_thread(self, func: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(sql_executor, functools.partial(func, *args, **kwargs))
+
+    async def list_tables(self) -> str:
+        """Use this function to get a list of table names in the database.
+
+        Returns:
+            str: list of tables in the database.
+        """
+        if self.tables is not None:
+            return json.dumps(self.tables)
+        if not self.is_async:
+            return await self._in_thread(self.sync_tools.list_tables)
+
+        try:
+            log_debug("listing tables in the database")
+            async with self.db_engine.connect() as conn:
+                table_names = await conn.run_sync(
+                    lambda sync_conn: inspect(sync_conn).get_table_names(schema=self.schema)
+                )
+            log_debug(f"table_names: {table_names}")
+            return json.dumps(table_names)
+        except Exception as e:
+            logger.error(f"Error getting tables: {e}")
+            return f"Error getting tables: {e}"
+
+    async def describe_table(self, table_name: str) -> str:
+        """Use this function to describe a table.
+
+        Args:
+            table_name (str): The name of the table to get the schema for.
+
+        Returns:
+            str: schema of a table
+        """
+        if not self.is_async:
+            return await self._in_thread(self.sync_tools.describe_table, table_name)
+
+        try:
+            log_debug(f"Describing table: {table_name}")
+            async with self.db_engine.connect() as conn:
+                table_schema = await conn.run_sync(
+                    lambda sync_conn: inspect(sync_conn).get_columns(table_name, schema=self.schema)
+                )
+            return json.dumps(
+                [
+                    {"name": column["name"], "type": str(column["type"]), "nullable": column["nullable"]}
+                    for column in table_schema
+                ]
+            )
+        except Exception as e:
+            logger.error(f"Error getting table schema: {e}")
+            return f"Error getting table schema: {e}"
+
+    async def reflect_schema(self) -> DatabaseSchema:
+        """Reflect every table, column, primary key and foreign key in bulk.
+
+        Returns:
+            DatabaseSchema: structured schema of the database.
+        """
+        if not self.is_async:
+            return await self._in_thread(self.sync_tools.reflect_schema)
+
+        async with self.db_engine.connect() as conn:
+            return await conn.run_sync(reflect_schema, self.schema)
+
+    async def schema_version(self) -> Optional[str]:
+        """Probe a short hash that changes whenever the database schema changes.
+
+        Returns:
+            Optional[str]: schema version, or None if the dialect cannot be probed.
+        """
+        if not self.is_async:
+            return await self._in_thread(self.sync_tools.schema_version)
+
+        try:
+            async with self.db_engine.connect() as conn:
+                return await conn.run_sync(probe_schema_version, self.schema)
+        except Exception as e:
+            logger.error(f"Error probing schema version: {e}")
+            return None
+
+    async def run_sql_query(self, query: str, limit: Optional[int] = 10) -> str:
+        """Use this function to run a SQL query and return the result.
+
+        Args:
+            query (str): The query to run.
+            limit (int, optional): The number of rows to return. Defaults to 10. Use `None` to show all results.
+        Returns:
+            str: Result of the SQL query.
+        Notes:
+            - The result may be empty if the query does not return any data.
+        """
+
+        try:
+            return json.dumps(await self.run_sql(sql=query, limit=limit), default=str)
+        except Exception as e:
+            logger.error(f"Error running query: {e}")
+            return f"Error running query: {e}"
+
+    async def run_query(self, query: str, limit: Optional[int] = 10) -> QueryResult:
+        """Run a SQL query and return its columns and row tuples.
+
+        Args:
+            query (str): The query to run.
+            limit (int, optional): The number of rows to return. Defaults to 10. Use `None` to show all results.
+        Returns:
+            QueryResult: Columns and rows, or the error message.
+        """
+        if not self.is_async:
+            return await self._in_thread(self.sync_tools.run_query, query, limit=limit)
+
+        dialect = self.db_engine.dialect
+        sql = with_statement_timeout(dialect, push_down_limit(query, limit, dialect.name), self.statement_timeout_ms)
+        log_debug(f"Running sql |\n{sql}")
+
+        try:
+            async with self.Session() as sess, sess.begin():
+                timeout_sql = statement_timeout_sql(dialect, self.statement_timeout_ms)
+                if timeout_sql is not None:
+                    await sess.execute(text(timeout_sql))
+                result = await sess.execute(text(sql))
+                if not result.returns_rows:
+                    return QueryResult()
+                rows = result.fetchmany(limit) if limit else result.fetchall()
+                return QueryResult(list(result.keys()), rows)
+        except Exception as e:
+            logger.error(f"Error running query: {e}")
+            return QueryResult(error=f"Error running query: {e}")
+
+    async def explain_query(self, query: str, limit: Optional[int] = 10) -> Optional[CostEstimate]:
+        """Estimate the cost of a SQL query with EXPLAIN, without running it.
+
+        Args:
+            query (str): The query to estimate.
+            limit (int, optional): The row limit it will run with, pushed down as in `run_query`.
+        Returns:
+            CostEstimate: The planner's estimate, or None if the dialect or plan cannot be read.
+        """
+        if not self.is_async:
+            return await self._in_thread(self.sync_tools.explain_query, query, limit=limit)
+
+        dialect = self.db_engine.dialect
+        explain_sql = explain_statement(dialect, push_down_limit(query, limit, dialect.name))
+        if explain_sql is None:
+            return None
+
+        try:
+            async with self.Session() as sess, sess.begin():
+                timeout_sql = statement_timeout_sql(dialect, self.statement_timeout_ms)
+                if timeout_sql is not None:
+                    await sess.execute(text(timeout_sql))
+                result = await sess.execute(text(explain_sql))
+                return parse_explain(dialect, result.fetchall())
+        except Exception as e:
+            logger.warning(f"Error explaining query: {e}")
+            return None
+
+    async def stream_query(
+        self, query: str, batch_size: int = 1000
+    ) -> AsyncIterator[Tuple[List[str], List[Tuple[Any, ...]]]]:
+        """Run a SQL query on a server-side cursor, yielding its rows in batches.
+
+        The next batch is only fetched once the caller asks for it, so a slow
+        consumer holds back the database instead of filling memory.
+
+        Args:
+            query (str): The query to run.
+            batch_size (int): Rows fetched from the database per batch.
+        Returns:
+            AsyncIterator: `(columns, rows)` per batch.
+        """
+        if not self.is_async:
+            async for batch in iterate_in_thread(
+                lambda: self.sync_tools.stream_query(query, batch_size=batch_size),
+                max_buffered=2,
+                executor=sql_executor,
+            ):
+                yield batch
+            return
+
+        query = with_statement_timeout(self.db_engine.dialect, query, self.statement_timeout_ms)
+        log_debug(f"Streaming sql |\n{query}")
+
+        async with self.db_engine.connect() as conn, conn.begin():
+            timeout_sql = statement_timeout_sql(self.db_engine.dialect, self.statement_timeout_ms)
+            if timeout_sql is not None:
+                await conn.execute(text(timeout_sql))
+            result = await conn.stream(text(query), execution_options={"yield_per": batch_size})
+            columns = list(result.keys())
+            empty = True
+            async for partition in result.partitions(batch_size):
+                empty = False
+                yield columns, [tuple(row) for row in partition]
+            if empty:
+                # Still report the columns of an empty result
+                yield columns, []
+
+    async def run_sql(self, sql: str, limit: Optional[int] = None) -> List[dict]:
+        """Internal function to run a sql query.
+
+        The limit is pushed into the statement so the database stops early, and the
+        statement timeout is applied to the transaction or the statement itself.
+
+        Args:
+            sql (str): The sql query to run.
+            limit (int, optional): The number of rows to return. Defaults to None.
+
+        Returns:
+            List[dict]: The result of the query.
+        """
+        if not self.is_async:
+            return await self._in_thread(self.sync_tools.run_sql, sql=sql, limit=limit)
+
+        dialect = self.db_engine.dialect
+        sql = with_statement_timeout(dialect, push_down_limit(sql, limit, dialect.name), self.statement_timeout_ms)
+        log_debug(f"Running sql |\n{sql}")
+
+        async with self.Session() as sess, sess.begin():
+            timeout_sql = statement_timeout_sql(dialect, self.statement_timeout_ms)
+            if timeout_sql is not None:
+                await sess.execute(text(timeout_sql))
+            result = await sess.execute(text(sql))
+
+            # Check if the operation has returned rows.
+            try:
+                if limit:
+                    rows = result.fetchmany(limit)
+                else:
+                    rows = result.fetchall()
+                return [row._asdict() for row in rows]
+            except Exception as e:
+                logger.error(f"Error while executing SQL: {e}")
+                return []
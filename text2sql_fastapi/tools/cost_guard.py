@@ -0,0 +1,206 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from config import settings
+
+"""
+Pre-flight cost guard for generated SQL: the database's own EXPLAIN estimate
+(rows and planner cost) is compared with the user's plan budget before the
+query runs, and over-budget queries are rejected, limited or run in a small
+"heavy" queue so runaway scans cannot take over a customer's database or our workers.
+"""
+
+COST_ACTIONS = ("reject", "limit", "queue")
+
+
+class CostEstimate:
+    """
+    Planner estimate for one query: rows examined by its largest step (rows returned
+    when a LIMIT stops it early), total cost (in the planner's own units) and the
+    tables it reads in full.
+    """
+    def __init__(self, rows: Optional[float] = None, cost: Optional[float] = None, scans: Optional[List[str]] = None):
+        self.rows = rows
+        self.cost = cost
+        self.scans = scans or []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "cost": self.cost, "scans": self.scans}
+
+
+def explain_statement(dialect: Any, sql: str) -> Optional[str]:
+    """
+    EXPLAIN variant that returns an estimate without running the query, or None
+    if the dialect has none we can read.
+    """
+    if dialect.name == "postgresql":
+        return f"EXPLAIN (FORMAT JSON) {sql}"
+    if dialect.name == "mysql":
+        return f"EXPLAIN FORMAT=JSON {sql}"
+    if dialect.name == "sqlite":
+        return f"EXPLAIN QUERY PLAN {sql}"
+    return None
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _walk(node: Any) -> Iterator[Dict[str, Any]]:
+    # Every dict in a nested EXPLAIN document
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def _document(value: Any) -> Any:
+    # JSON plans arrive as text or already decoded, depending on the driver
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
+
+
+def _postgres_estimate(rows: Sequence[Sequence[Any]]) -> CostEstimate:
+    plan = _document(rows[0][0])[0]["Plan"]
+    nodes = list(_walk(plan))
+    if plan.get("Node Type") == "Limit":
+        # Scans under a LIMIT stop early, so their row estimates overstate the work;
+        # what they cannot skip (a sort or aggregate over everything) is in the cost
+        estimated_rows = _number(plan.get("Plan Rows"))
+    else:
+        estimated_rows = max((_number(node.get("Plan Rows")) or 0 for node in nodes), default=None)
+    return CostEstimate(
+        rows=estimated_rows,
+        cost=_number(plan.get("Total Cost")),
+        scans=[node["Relation Name"] for node in nodes if node.get("Node Type") == "Seq Scan" and "Relation Name" in node],
+    )
+
+
+def _mysql_estimate(rows: Sequence[Sequence[Any]]) -> CostEstimate:
+    document = _document(rows[0][0])
+    tables = [node for node in _walk(document) if "table_name" in node and "access_type" in node]
+    # MySQL reports rows_examined_per_scan, MariaDB rows
+    examined = [_number(table.get("rows_examined_per_scan", table.get("rows"))) for table in tables]
+    cost_info = document.get("query_block", {}).get("cost_info", {})
+    return CostEstimate(
+        rows=max((value for value in examined if value is not None), default=None),
+        cost=_number(cost_info.get("query_cost")),
+        scans=[table["table_name"] for table in tables if table["access_type"] == "ALL"],
+    )
+
+
+def _sqlite_estimate(rows: Sequence[Sequence[Any]]) -> CostEstimate:
+    # SQLite gives no numbers, only which tables are scanned rather than searched
+    scans = []
+    for row in rows:
+        words = str(row[-1]).split()
+        if words and words[0] == "SCAN" and len(words) > 1:
+            scans.append(words[2] if words[1] == "TABLE" and len(words) > 2 else words[1])
+    return CostEstimate(scans=scans)
+
+
+def parse_explain(dialect: Any, rows: Sequence[Sequence[Any]]) -> Optional[CostEstimate]:
+    """
+    Estimate from the rows returned by `explain_statement`, or None if they cannot be read.
+    """
+    if not rows:
+        return None
+    try:
+        if dialect.name == "postgresql":
+            return _postgres_estimate(rows)
+        if dialect.name == "mysql":
+            return _mysql_estimate(rows)
+        if dialect.name == "sqlite":
+            return _sqlite_estimate(rows)
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+        return None
+    return None
+
+
+class CostBudget:
+    """
+    Estimated rows and cost a user's plan allows per query (0 means no limit),
+    and what to do with a query over budget.
+    """
+    def __init__(self, max_rows: float = 0, max_cost: float = 0, action: str = "queue"):
+        self.max_rows = max_rows
+        self.max_cost = max_cost
+        self.action = action if action in COST_ACTIONS else "queue"
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_rows or self.max_cost)
+
+    def exceeded(self, estimate: CostEstimate) -> Optional[str]:
+        """
+        Why the estimate is over budget, or None if it is within it (or unknown).
+        """
+        if self.max_rows and estimate.rows is not None and estimate.rows > self.max_rows:
+            return f"The query is estimated to read {estimate.rows:,.0f} rows, over the {self.max_rows:,.0f} allowed by your plan"
+        if self.max_cost and estimate.cost is not None and estimate.cost > self.max_cost:
+            return f"The query has an estimated cost of {estimate.cost:,.0f}, over the {self.max_cost:,.0f} allowed by your plan"
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"max_rows": self.max_rows or None, "max_cost": self.max_cost or None, "action": self.action}
+
+
+class HeavyQueryBusyError(Exception):
+    """
+    Raised when no heavy query slot frees up within the acquire timeout.
+    """
+    pass
+
+
+class HeavyQueryQueue:
+    """
+    Runs over-budget queries at most `max_concurrency` at a time per worker, so
+    they queue behind each other instead of competing with ordinary queries.
+    """
+    def __init__(self, max_concurrency: int, acquire_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold a heavy query slot for the duration of the block.
+        """
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HeavyQueryBusyError("Too many expensive queries are running, please retry shortly")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+heavy_query_queue = HeavyQueryQueue(
+    max_concurrency=settings.heavy_query_concurrency,
+    acquire_timeout=settings.heavy_query_acquire_timeout,
+)
@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from agno.utils.log import log_debug, logger
+
+try:
+    from sqlalchemy import Engine, create_engine
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+except ImportError:
+    raise ImportError("`sqlalchemy` not installed")
+
+from config import settings
+
+"""
+Process-wide registry of SQLAlchemy engines for customer databases.
+Engines are pooled and reused across requests, keyed by their normalized connection URL.
+"""
+
+
+def normalize_db_url(db_url: str) -> str:
+    """
+    Normalize a database URL so equivalent connection strings share one engine.
+    Lower-cases the driver and host and sorts query parameters.
+    """
+    url = make_url(db_url)
+    url = url.set(
+        drivername=url.drivername.lower(),
+        host=url.host.lower() if url.host else url.host,
+        query=dict(sorted(url.query.items())),
+    )
+    return url.render_as_string(hide_password=False)
+
+
+class EngineRegistry:
+    """
+    Bounded LRU cache of pooled engines. Each entry holds at most
+    `pool_size + max_overflow` connections to its database; evicted and idle
+    engines are disposed so their sockets are released.
+    """
+    def __init__(
+        self,
+        max_engines: int = 32,
+        pool_size: int = 5,
+        max_overflow: int = 5,
+        pool_timeout: int = 30,
+        pool_recycle: int = 1800,
+        idle_timeout: int = 900,
+    ):
+        self.max_engines = max_engines
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.idle_timeout = idle_timeout
+
+        self._engines: "OrderedDict[str, Engine]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _engine_kwargs(self, db_url: str) -> dict:
+        """
+        Pool arguments applying pre-ping and the per-tenant connection ceiling.
+        """
+        kwargs = {"pool_pre_ping": True, "pool_recycle": self.pool_recycle}
+        # SQLite uses a single-connection pool that does not accept sizing arguments
+        if make_url(db_url).get_backend_name() != "sqlite":
+            kwargs.update(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+            )
+        return kwargs
+
+    def _create_engine(self, db_url: str) -> Engine:
+        return create_engine(db_url, **self._engine_kwargs(db_url))
+
+    def _checkout(self, db_url: str, normalized: bool = False):
+        """
+        Look up or create the engine for a database URL and collect engines that
+        were evicted or went idle meanwhile. Returns `(engine, stale_engines)`.
+        """
+        key = db_url if normalized else normalize_db_url(db_url)
+        stale = []
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is not None:
+                self._engines.move_to_end(key)
+            else:
+                log_debug(f"Creating pooled engine for {make_url(key)!r}")
+                engine = self._create_engine(key)
+                self._engines[key] = engine
+                while len(self._engines) > self.max_engines:
+                    old_key, old_engine = self._engines.popitem(last=False)
+                    self._last_used.pop(old_key, None)
+                    stale.append(old_engine)
+            self._last_used[key] = time.monotonic()
+            stale.extend(self._pop_idle(exclude=key))
+        return engine, stale
+
+    def get_engine(self, db_url: str, normalized: bool = False) -> Engine:
+        """
+        Return the pooled engine for a database URL, creating it on first use.
+        Pass `normalized=True` for a URL from `normalize_db_url` to skip parsing it again.
+        """
+        engine, stale = self._checkout(db_url, normalized)
+        for old_engine in stale:
+            self._dispose(old_engine)
+        return engine
+
+    def _pop_idle(self, exclude: Optional[str] = None) -> list:
+        """
+        Remove engines unused for longer than `idle_timeout`. Caller must hold the lock.
+        """
+        if not self.idle_timeout:
+            return []
+        now = time.monotonic()
+        idle_keys = [
+            key for key, last_used in self._last_used.items()
+            if key != exclude and now - last_used > self.idle_timeout
+        ]
+        idle = []
+        for key in idle_keys:
+            self._last_used.pop(key, None)
+            engine = self._engines.pop(key, None)
+            if engine is not None:
+                idle.append(engine)
+        return idle
+
+    def _dispose(self, engine: Engine) -> None:
+        try:
+            engine.dispose()
+        except Exception as e:
+            logger.warning(f"Error disposing engine: {e}")
+
+    def dispose(self, db_url: str) -> bool:
+        """
+        Dispose the engine for a database URL. Returns True if one was registered.
+        """
+        key = normalize_db_url(db_url)
+        with self._lock:
+            self._last_used.pop(key, None)
+            engine = self._engines.pop(key, None)
+        if engine is None:
+            return False
+        self._dispose(engine)
+        return True
+
+    def dispose_idle(self) -> int:
+        """
+        Dispose every engine idle for longer than `idle_timeout`. Returns the number disposed.
+        """
+        with self._lock:
+            idle = self._pop_idle()
+        for engine in idle:
+            self._dispose(engine)
+        return len(idle)
+
+    def dispose_all(self) -> None:
+        """
+        Dispose every registered engine. Called from the application shutdown hook.
+        """
+        for engine in self._pop_all():
+            self._dispose(engine)
+
+    def _pop_all(self) -> list:
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+            self._last_used.clear()
+        return engines
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+
+class AsyncEngineRegistry(EngineRegistry):
+    """
+    Registry variant holding `AsyncEngine`s for dialects with an async driver.
+    Disposing an async engine must be awaited, so lookups and shutdown are coroutines.
+    """
+    def _create_engine(self, db_url: str) -> AsyncEngine:
+        return create_async_engine(db_url, **self._engine_kwargs(db_url))
+
+    async def _adispose(self, engine: AsyncEngine) -> None:
+        try:
+            await engine.dispose()
+        except Exception as e:
+            logger.warning(f"Error disposing async engine: {e}")
+
+    async def get_engine(self, db_url: str, normalized: bool = False) -> AsyncEngine:
+        """
+        Return the pooled async engine for a database URL, creating it on first use.
+        Pass `normalized=True` for a URL from `normalize_db_url` to skip parsing it again.
+        """
+        engine, stale = self._checkout(db_url, normalized)
+        for old_engine in stale:
+            await self._adispose(old_engine)
+        return engine
+
+    async def dispose_idle(self) -> int:
+        """
+        Dispose every engine idle for longer than `idle_timeout`. Returns the number disposed.
+        """
+        with self._lock:
+            idle = self._pop_idle()
+        for engine in idle:
+            await self._adispose(engine)
+        return len(idle)
+
+    async def dispose_all(self) -> None:
+        """
+        Dispose every registered async engine. Called from the application shutdown hook.
+        """
+        for engine in self._pop_all():
+            await self._adispose(engine)
+
+
+engine_registry = EngineRegistry(
+    max_engines=settings.sql_engine_cache_size,
+    pool_size=settings.sql_engine_pool_size,
+    max_overflow=settings.sql_engine_max_overflow,
+    pool_timeout=settings.sql_engine_pool_timeout,
+    pool_recycle=settings.sql_engine_pool_recycle,
+    idle_timeout=settings.sql_engine_idle_timeout,
+)
+
+async_engine_registry = AsyncEngineRegistry(
+    max_engines=settings.sql_engine_cache_size,
+    pool_size=settings.sql_engine_pool_size,
+    max_overflow=settings.sql_engine_max_overflow,
+    pool_timeout=settings.sql_engine_pool_timeout,
+    pool_recycle=settings.sql_engine_pool_recycle,
+    idle_timeout=settings.sql_engine_idle_timeout,
+)
@@ -0,0 +1,264 @@
+import hashlib
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import jwt
+
+from config import settings
+from tools.schema_reflector import DatabaseSchema
+from tools.sql_validator import SQLGLOT_DIALECTS, literal_limit, sqlglot
+
+if sqlglot is not None:
+    from sqlglot import exp
+
+"""
+Keyset pagination of generated queries. The query's ORDER BY (plus primary or
+group keys as tie-breakers) becomes the page key; later pages wrap the query
+and seek past the last key seen, so no LLM call or OFFSET scan is needed.
+Continuation tokens are signed, so the SQL they carry cannot be tampered with.
+"""
+
+
+class KeysetPlan:
+    """
+    A query prepared for keyset paging: the query without ORDER BY/LIMIT, and the
+    output columns (with their sort order) that identify a row's position.
+    """
+    def __init__(self, base: "exp.Select", keys: List[Tuple["exp.Identifier", "exp.Ordered"]], limit: Optional[int], dialect: Optional[str]):
+        self.base = base
+        self.keys = keys
+        self.limit = limit
+        self.dialect = dialect
+
+    def key_values(self, columns: Sequence[str], row: Sequence[Any]) -> Optional[List[Any]]:
+        """
+        Key values of a result row, or None if a key is missing or NULL.
+        """
+        positions = {column.lower(): index for index, column in enumerate(columns)}
+        values = []
+        for identifier, _ in self.keys:
+            index = positions.get(identifier.name.lower())
+            if index is None or row[index] is None:
+                return None
+            values.append(row[index])
+        return values
+
+    def page_sql(self, last: Optional[Sequence[Any]], page_size: int) -> str:
+        """
+        SQL for the page after the row with key values `last` (the first page if None).
+        """
+        query = exp.select("*").from_(self.base.copy().subquery("page_query"))
+        if last:
+            # (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ..., with < for descending keys
+            branches = []
+            for i, (identifier, ordered) in enumerate(self.keys):
+                comparison = exp.LT if ordered.args.get("desc") else exp.GT
+                terms = [
+                    exp.EQ(this=exp.column(self.keys[j][0].copy()), expression=_literal(last[j]))
+                    for j in range(i)
+                ]
+                terms.append(comparison(this=exp.column(identifier.copy()), expression=_literal(last[i])))
+                branches.append(exp.and_(*terms) if len(terms) > 1 else terms[0])
+            query = query.where(exp.or_(*branches) if len(branches) > 1 else branches[0])
+        order = []
+        for identifier, ordered in self.keys:
+            ordered = ordered.copy()
+            ordered.set("this", exp.column(identifier.copy()))
+            order.append(ordered)
+        return query.order_by(*order).limit(page_size).sql(dialect=self.dialect)
+
+
+def _literal(value: Any) -> "exp.Expression":
+    if isinstance(value, bool):
+        return exp.Boolean(this=value)
+    if isinstance(value, (int, float, Decimal)):
+        return exp.Literal.number(str(value))
+    return exp.Literal.string(str(value))
+
+
+def _output_columns(select: "exp.Select", db_schema: DatabaseSchema) -> Optional[Dict[str, "exp.Identifier"]]:
+    """
+    Output column name -> identifier as written, or None if `*` cannot be expanded.
+    """
+    outputs: Dict[str, exp.Identifier] = {}
+    tables = {table.name.lower(): table for table in db_schema.tables.values()}
+    for projection in select.expressions:
+        if isinstance(projection, exp.Star) or (isinstance(projection, exp.Column) and isinstance(projection.this, exp.Star)):
+            sources = list(select.find_all(exp.Table))
+            if select.args.get("joins") or len(sources) != 1 or sources[0].name.lower() not in tables:
+                return None
+            for column in tables[sources[0].name.lower()].columns:
+                outputs.setdefault(column.name.lower(), exp.to_identifier(column.name, quoted=column.name != column.name.lower()))
+        elif isinstance(projection, exp.Alias):
+            outputs[projection.alias.lower()] = projection.args["alias"].copy()
+        elif isinstance(projection, exp.Column):
+            outputs[projection.name.lower()] = projection.this.copy()
+    return outputs
+
+
+def _selected_columns(select: "exp.Select", db_schema: DatabaseSchema) -> List[Tuple[str, str, str]]:
+    """
+    `(table qualifier, column, output name)` of each projection that returns a
+    source column unchanged, lower-cased; the qualifier is "" when not written.
+    """
+    selected = []
+    for projection in select.expressions:
+        column = projection.this if isinstance(projection, exp.Alias) else projection
+        if isinstance(column, exp.Column) and not isinstance(column.this, exp.Star):
+            selected.append((column.table.lower(), column.name.lower(), projection.alias_or_name.lower()))
+        elif isinstance(projection, exp.Star) or (isinstance(projection, exp.Column) and isinstance(projection.this, exp.Star)):
+            # `_output_columns` already checked this is a single schema table
+            table = next(table for table in db_schema.tables.values() if table.name.lower() == select.find(exp.Table).name.lower())
+            selected.extend(("", column.name.lower(), column.name.lower()) for column in table.columns)
+    return selected
+
+
+def _unique_outputs(select: "exp.Select", db_schema: DatabaseSchema) -> Optional[List[str]]:
+    """
+    Output columns that together identify a row: every GROUP BY key, else the
+    primary key of the only table read. None unless all of them are selected.
+    """
+    group = select.args.get("group")
+    if group:
+        if not all(isinstance(expression, exp.Column) for expression in group.expressions):
+            # Expressions, ROLLUP, CUBE and grouping sets
+            return None
+        keys = [(expression.table.lower(), expression.name.lower()) for expression in group.expressions]
+    else:
+        sources = list(select.find_all(exp.Table))
+        if select.args.get("joins") or len(sources) != 1 or select.find(exp.Subquery, exp.CTE) is not None:
+            return None
+        tables = {table.name.lower(): table for table in db_schema.tables.values()}
+        table = tables.get(sources[0].name.lower())
+        if table is None or not table.primary_key:
+            return None
+        keys = [("", column.lower()) for column in table.primary_key]
+
+    selected = _selected_columns(select, db_schema)
+    unique = []
+    for qualifier, name in keys:
+        matches = [
+            output for table, column, output in selected
+            if column == name and not (qualifier and table and qualifier != table)
+        ]
+        if not matches:
+            return None
+        unique.append(matches[0])
+    return unique
+
+
+def plan_keyset(sql: str, db_schema: DatabaseSchema) -> Optional[KeysetPlan]:
+    """
+    Keyset plan for a validated query, or None if its order cannot be expressed as
+    output columns (e.g. ORDER BY an expression that is not selected) or made
+    unique with selected group or primary key columns.
+    """
+    if sqlglot is None:
+        return None
+    dialect = SQLGLOT_DIALECTS.get(db_schema.dialect)
+    try:
+        tree = sqlglot.parse_one(sql, read=dialect)
+    except sqlglot.errors.SqlglotError:
+        return None
+    if not isinstance(tree, exp.Select):
+        return None
+    outputs = _output_columns(tree, db_schema)
+    if not outputs:
+        return None
+
+    # Without an ORDER BY the first page had no defined order to continue from
+    order = tree.args.get("order")
+    if not order:
+        return None
+    keys: List[Tuple[exp.Identifier, exp.Ordered]] = []
+    for ordered in order.expressions:
+        expression = ordered.this
+        if isinstance(expression, exp.Column):
+            name = expression.name.lower()
+        elif isinstance(expression, exp.Literal) and not expression.is_string and expression.this.isdigit():
+            position = int(expression.this) - 1
+            if not 0 <= position < len(tree.expressions):
+                return None
+            name = tree.expressions[position].alias_or_name.lower()
+        else:
+            return None
+        if name not in outputs:
+            return None
+        keys.append((outputs[name], ordered))
+
+    # Tie-breakers so every row has a distinct position: group keys, else the table's
+    # primary key. Without them rows tied on the order could be skipped or repeated.
+    unique = _unique_outputs(tree, db_schema)
+    if unique is None:
+        return None
+    seen = {identifier.name.lower() for identifier, _ in keys}
+    for name in unique:
+        if name not in seen:
+            seen.add(name)
+            # Parsed so the dialect's default NULL ordering applies
+            ordered = sqlglot.parse_one(f"SELECT 1 ORDER BY {outputs[name].sql(dialect=dialect)}", read=dialect)
+            keys.append((outputs[name], ordered.args["order"].expressions[0]))
+
+    limit = literal_limit(tree)
+    base = tree.copy()
+    for clause in ("order", "limit", "offset", "fetch"):
+        base.set(clause, None)
+    return KeysetPlan(base, keys, limit if limit and limit > 0 else None, dialect)
+
+
+def _tag(value: Any) -> List[Any]:
+    # Typed so numbers and text round-trip through JSON as the right literal
+    if isinstance(value, bool):
+        return ["b", value]
+    if isinstance(value, (int, float, Decimal)):
+        return ["n", str(value)]
+    if isinstance(value, datetime):
+        return ["s", value.isoformat(sep=" ")]
+    if isinstance(value, date):
+        return ["s", value.isoformat()]
+    return ["s", str(value)]
+
+
+def _untag(value: List[Any]) -> Any:
+    kind, text = value
+    if kind == "n":
+        return Decimal(text)
+    return text
+
+
+def _database_hash(db_url: str) -> str:
+    return hashlib.sha256(db_url.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_continuation(user_id: str, db_url: str, fingerprint: Optional[str], sql: str, last: Sequence[Any], remaining: Optional[int]) -> str:
+    """
+    Signed, opaque token for the page after the row with key values `last`;
+    `remaining` is how many rows the query's own LIMIT still allows (None if unlimited).
+    """
+    payload = {
+        "sub": str(user_id),
+        "db": _database_hash(db_url),
+        "fp": fingerprint,
+        "sql": sql,
+        "last": [_tag(value) for value in last],
+        "remaining": remaining,
+        "exp": int(time.time()) + settings.continuation_token_ttl,
+    }
+    return jwt.encode(payload=payload, key=settings.jwt_secret, algorithm=settings.jwt_algorithm)
+
+
+def decode_continuation(token: str, user_id: str, db_url: str) -> Optional[Dict[str, Any]]:
+    """
+    Payload of a continuation token issued to this user for this database, or None
+    if it is invalid, expired or belongs to someone else.
+    """
+    try:
+        payload = jwt.decode(jwt=token, key=settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+    except jwt.PyJWTError:
+        return None
+    if payload.get("sub") != str(user_id) or payload.get("db") != _database_hash(db_url):
+        return None
+    payload["last"] = [_untag(value) for value in payload["last"]]
+    return payload
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from config import settings
+from tools.streaming import iterate_in_thread
+
+"""
+Non-blocking gateway for LLM calls. The agno agents and Gemini client are
+synchronous, so calls run on a bounded thread pool behind a global and a
+per-tenant concurrency limit, keeping the event loop free for other routes.
+"""
+
+
+class LLMBusyError(Exception):
+    """
+    Raised when no LLM slot frees up within the acquire timeout.
+    """
+    pass
+
+
+class LLMGateway:
+    """
+    Runs blocking LLM calls off the event loop, at most `max_concurrency` at a time
+    and at most `tenant_max_concurrency` per tenant.
+    """
+    def __init__(self, max_concurrency: int, tenant_max_concurrency: int, acquire_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.tenant_max_concurrency = tenant_max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._global = asyncio.Semaphore(max_concurrency)
+        # tenant -> [semaphore, number of calls holding or waiting for it]
+        self._tenants: Dict[str, List[Any]] = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def _tenant_semaphore(self, tenant: str) -> asyncio.Semaphore:
+        entry = self._tenants.get(tenant)
+        if entry is None:
+            entry = self._tenants[tenant] = [asyncio.Semaphore(self.tenant_max_concurrency), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _release_tenant(self, tenant: str) -> None:
+        entry = self._tenants[tenant]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._tenants[tenant]
+
+    @asynccontextmanager
+    async def slot(self, tenant: Optional[str] = None):
+        """
+        Hold a global slot (and one of the tenant's slots) for the duration of the block.
+        """
+        tenant = str(tenant) if tenant is not None else None
+        tenant_semaphore = self._tenant_semaphore(tenant) if tenant else None
+        semaphores = [s for s in (tenant_semaphore, self._global) if s is not None]
+        deadline = time.monotonic() + self.acquire_timeout
+        acquired: List[asyncio.Semaphore] = []
+        try:
+            self.waiting += 1
+            try:
+                for semaphore in semaphores:
+                    try:
+                        await asyncio.wait_for(semaphore.acquire(), timeout=max(deadline - time.monotonic(), 0))
+                    except asyncio.TimeoutError:
+                        self.rejected += 1
+                        raise LLMBusyError("Too many concurrent LLM requests, please retry shortly")
+                    acquired.append(semaphore)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
+            if tenant:
+                self._release_tenant(tenant)
+
+    async def call(self, func: Callable[..., Any], *args, tenant: Optional[str] = None, **kwargs) -> Any:
+        """
+        Run a blocking LLM-bound callable on the gateway's thread pool.
+        """
+        async with self.slot(tenant):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def run(self, agent: Any, prompt: str, tenant: Optional[str] = None, **kwargs) -> Any:
+        """
+        Non-blocking `agent.run(prompt)`.
+        """
+        return await self.call(agent.run, prompt, tenant=tenant, **kwargs)
+
+    async def stream(self, agent: Any, prompt: str, tenant: Optional[str] = None, **kwargs) -> AsyncIterator[Any]:
+        """
+        Non-blocking `agent.run(prompt, stream=True)`, yielding chunks as they arrive.
+        The slot is held until the stream ends.
+        """
+        async with self.slot(tenant):
+            async for chunk in iterate_in_thread(lambda: agent.run(prompt, stream=True, **kwargs), executor=self._executor):
+                yield chunk
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "tenants": len(self._tenants),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+llm_gateway = LLMGateway(
+    max_concurrency=settings.llm_max_concurrency,
+    tenant_max_concurrency=settings.llm_tenant_max_concurrency,
+    acquire_timeout=settings.llm_acquire_timeout,
+)
@@ -0,0 +1,200 @@
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from agno.agent import Agent
+from agno.models.google import Gemini
+
+from config import settings
+
+"""
+Long-lived registry of Gemini models and pooled agno Agents, created at startup.
+Every model id shares one Gemini client (and its keep-alive HTTP pool); agents
+are checked out per call because agno Agents keep per-run state. Agents can be
+constrained to JSON output matching a pydantic schema.
+"""
+
+
+class ModelStats:
+    """
+    Call counters and latency of one model id.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.last_latency: Optional[float] = None
+        self.last_success_at: Optional[float] = None
+        self.last_error_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.calls += 1
+            self.total_latency += latency
+            self.last_latency = latency
+            if error is None:
+                self.last_success_at = time.time()
+            else:
+                self.errors += 1
+                self.last_error_at = time.time()
+                self.last_error = str(error)[:200]
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            # Healthy until the most recent call failed
+            healthy = self.last_error_at is None or (self.last_success_at or 0) > self.last_error_at
+            return {
+                "healthy": healthy,
+                "calls": self.calls,
+                "errors": self.errors,
+                "avg_latency_ms": round(self.total_latency / self.calls * 1000, 1) if self.calls else None,
+                "last_latency_ms": round(self.last_latency * 1000, 1) if self.last_latency is not None else None,
+                "last_error": self.last_error,
+            }
+
+
+class PooledAgent:
+    """
+    Stand-in for an agno Agent that runs each call on an agent checked out from
+    its model's pool. `model` is the shared Gemini instance, for client access.
+    """
+    def __init__(self, registry: "ModelRegistry", model_id: str, json_schema: Optional[Type[BaseModel]] = None):
+        self.registry = registry
+        self.model_id = model_id
+        self.json_schema = json_schema
+        self.model: Gemini = registry.get_model(model_id)
+
+    def run(self, prompt: str, **kwargs) -> Any:
+        if kwargs.get("stream"):
+            return self._stream(prompt, **kwargs)
+        agent = self.registry._checkout(self.model_id, self.json_schema)
+        started = time.monotonic()
+        try:
+            response = agent.run(prompt, **kwargs)
+        except Exception as e:
+            self.registry.stats[self.model_id].record(time.monotonic() - started, e)
+            raise
+        finally:
+            self.registry._checkin(self.model_id, agent, self.json_schema)
+        self.registry.stats[self.model_id].record(time.monotonic() - started)
+        return response
+
+    def _stream(self, prompt: str, **kwargs) -> Iterator[Any]:
+        agent = self.registry._checkout(self.model_id, self.json_schema)
+        started = time.monotonic()
+        try:
+            yield from agent.run(prompt, **kwargs)
+        except Exception as e:
+            self.registry.stats[self.model_id].record(time.monotonic() - started, e)
+            raise
+        finally:
+            self.registry._checkin(self.model_id, agent, self.json_schema)
+        self.registry.stats[self.model_id].record(time.monotonic() - started)
+
+
+class ModelRegistry:
+    """
+    Per-worker registry of shared Gemini models and idle Agent pools, keyed by model id.
+    """
+    def __init__(self, api_key: str, pool_size: int):
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self._models: Dict[str, Gemini] = {}
+        self._pools: Dict[Tuple[str, Optional[Type[BaseModel]]], "queue.LifoQueue[Agent]"] = {}
+        self.stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def get_model(self, model_id: str) -> Gemini:
+        """
+        Shared Gemini model for an id, with its client created once.
+        """
+        model = self._models.get(model_id)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(model_id)
+            if model is None:
+                model = Gemini(id=model_id, api_key=self.api_key)
+                model.get_client()
+                self.stats[model_id] = ModelStats()
+                self._models[model_id] = model
+        return model
+
+    def _pool(self, model_id: str, json_schema: Optional[Type[BaseModel]]) -> "queue.LifoQueue[Agent]":
+        self.get_model(model_id)
+        pool = self._pools.get((model_id, json_schema))
+        if pool is None:
+            with self._lock:
+                pool = self._pools.setdefault((model_id, json_schema), queue.LifoQueue(maxsize=self.pool_size))
+        return pool
+
+    def _new_agent(self, model_id: str, json_schema: Optional[Type[BaseModel]] = None) -> Agent:
+        shared = self.get_model(model_id)
+        generation_config = None
+        if json_schema is not None:
+            generation_config = {"response_mime_type": "application/json", "response_schema": json_schema}
+        model = Gemini(id=model_id, api_key=self.api_key, generation_config=generation_config)
+        # Same client, so the same HTTP connection pool
+        model.client = shared.get_client()
+        return Agent(model=model)
+
+    def _checkout(self, model_id: str, json_schema: Optional[Type[BaseModel]] = None) -> Agent:
+        try:
+            return self._pool(model_id, json_schema).get_nowait()
+        except queue.Empty:
+            return self._new_agent(model_id, json_schema)
+
+    def _checkin(self, model_id: str, agent: Agent, json_schema: Optional[Type[BaseModel]] = None) -> None:
+        pool = self._pools.get((model_id, json_schema))
+        if pool is None:
+            return
+        try:
+            pool.put_nowait(agent)
+        except queue.Full:
+            pass
+
+    def agent(self, model_id: Optional[str] = None, json_schema: Optional[Type[BaseModel]] = None) -> PooledAgent:
+        """
+        Agent-like handle for a model id (defaults to `llm_model_id`), optionally
+        constrained to JSON output matching `json_schema`.
+        """
+        return PooledAgent(self, model_id or settings.llm_model_id, json_schema)
+
+    def warm_up(self, *model_ids: str, json_schemas: Tuple[Optional[Type[BaseModel]], ...] = (None,)) -> None:
+        """
+        Create the models and fill their agent pools ahead of the first request.
+        """
+        for model_id in model_ids or (settings.llm_model_id,):
+            for json_schema in json_schemas:
+                pool = self._pool(model_id, json_schema)
+                while not pool.full():
+                    pool.put_nowait(self._new_agent(model_id, json_schema))
+            print(f"🤖 {model_id} ready with {self.pool_size} pooled agents per output format")
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Health and latency stats per model id.
+        """
+        idle: Dict[str, int] = {}
+        for (model_id, _), pool in list(self._pools.items()):
+            idle[model_id] = idle.get(model_id, 0) + pool.qsize()
+        return {
+            model_id: {**stats.to_dict(), "idle_agents": idle.get(model_id, 0)}
+            for model_id, stats in list(self.stats.items())
+        }
+
+    def close(self) -> None:
+        """
+        Drop every model, agent and client.
+        """
+        with self._lock:
+            self._models.clear()
+            self._pools.clear()
+
+
+model_registry = ModelRegistry(api_key=settings.gemini_api_key, pool_size=settings.llm_agent_pool_size)
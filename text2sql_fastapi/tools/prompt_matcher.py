@@ -0,0 +1,219 @@
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from tools.text_index import STOPWORDS, tokenize
+
+"""
+Local near-duplicate matching of prompts. A reworded prompt ("last month's 3 best
+sellers" after "top 3 selling products last month") reuses SQL validated for an
+earlier one without an LLM call when their normalized terms overlap enough and
+nothing that changes the answer differs: numbers, negation and time words, what
+the result is grouped by, and terms that are not schema names (filter values).
+"""
+
+# Words that flip a prompt's meaning while leaving its other terms alone
+# ("customers who never ordered", "sales this month" vs "last month")
+GUARD_WORDS = frozenset({
+    "no", "not", "never", "none", "non", "without", "except", "excluding",
+    "didn", "doesn", "don", "isn", "aren", "wasn", "weren", "hasn", "haven",
+    "this", "last", "next", "previous", "prior", "current", "past", "ago",
+    "today", "yesterday", "tomorrow", "before", "after", "since", "until",
+})
+
+# Words whose next term is what the result is grouped by ("orders by customer")
+ROLE_WORDS = frozenset({"by", "per", "each"})
+
+# Rankings and selling phrased differently
+SYNONYMS = {
+    "best": "top", "highest": "top", "biggest": "top", "largest": "top", "greatest": "top", "most": "top",
+    "worst": "bottom", "lowest": "bottom", "smallest": "bottom", "least": "bottom",
+    "sold": "sell", "sale": "sell",
+}
+
+
+def _term(token: str) -> str:
+    # `tokenize` already folded plurals; fold synonyms and -ing/-er forms on top
+    token = SYNONYMS.get(token, token)
+    if len(token) > 5 and token.endswith("ing"):
+        token = token[:-3]
+    if len(token) > 4 and token.endswith("er"):
+        token = token[:-2]
+    return SYNONYMS.get(token, token)
+
+
+def _words(text: str) -> list:
+    return [word for word in re.split(r"[^a-z0-9]+", text.lower()) if word]
+
+
+def prompt_terms(text: str) -> FrozenSet[str]:
+    """
+    Normalized terms of a prompt (or of schema names): stopwords removed, plurals,
+    synonyms and -ing/-er forms folded, in any order.
+    """
+    return frozenset(_term(token) for token in tokenize(text))
+
+
+def prompt_guards(prompt: str) -> FrozenSet[str]:
+    """
+    Negation and time words of a prompt, including those `tokenize` drops as stopwords.
+    """
+    return frozenset(word for word in _words(prompt) if word in GUARD_WORDS)
+
+
+def prompt_numbers(prompt: str) -> FrozenSet[str]:
+    """
+    Numbers in a prompt. "top 3" and "top 5" must never share SQL.
+    """
+    return frozenset(re.findall(r"\d+(?:\.\d+)?", prompt))
+
+
+def prompt_groups(prompt: str) -> FrozenSet[str]:
+    """
+    Terms the prompt groups or ranks by: the first content word after "by", "per"
+    or "each". "orders by customer" and "customers by order" differ here.
+    """
+    words = _words(prompt)
+    groups: Set[str] = set()
+    for index, word in enumerate(words):
+        if word not in ROLE_WORDS:
+            continue
+        following = next((w for w in words[index + 1:] if w not in STOPWORDS and w not in ROLE_WORDS), None)
+        if following is not None:
+            groups.add(_term(tokenize(following)[0]))
+    return frozenset(groups)
+
+
+def jaccard(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    if not left and not right:
+        return 1.0
+    return len(left & right) / len(left | right)
+
+
+class PromptFeatures:
+    """
+    What two prompts are compared on.
+    """
+    def __init__(self, prompt: str):
+        self.terms = prompt_terms(prompt)
+        self.guards = prompt_guards(prompt)
+        self.numbers = prompt_numbers(prompt)
+        self.groups = prompt_groups(prompt)
+
+    def compatible(self, other: "PromptFeatures") -> bool:
+        return self.guards == other.guards and self.numbers == other.numbers and self.groups == other.groups
+
+
+class NearDuplicateMatch:
+    """
+    A past prompt similar enough to reuse its SQL.
+    """
+    def __init__(self, prompt: str, similarity: float, entry: Dict[str, Any]):
+        self.prompt = prompt
+        self.similarity = similarity
+        self.entry = entry
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"matched_prompt": self.prompt, "similarity": round(self.similarity, 4)}
+
+
+class PromptMatcher:
+    """
+    Past prompts of one schema fingerprint with an inverted index from terms to
+    prompts, so a lookup only scores prompts sharing at least one term.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[PromptFeatures, Dict[str, Any]]]" = OrderedDict()
+        self.postings: Dict[str, Set[str]] = defaultdict(set)
+
+    def add(self, prompt: str, entry: Dict[str, Any]) -> None:
+        if prompt in self.entries:
+            self.remove(prompt)
+        features = PromptFeatures(prompt)
+        if not features.terms:
+            # Nothing but stopwords: too little to compare
+            return
+        self.entries[prompt] = (features, entry)
+        for term in features.terms:
+            self.postings[term].add(prompt)
+        while len(self.entries) > self.max_entries:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, prompt: str) -> None:
+        stored = self.entries.pop(prompt, None)
+        if stored is None:
+            return
+        for term in stored[0].terms:
+            members = self.postings.get(term)
+            if members is not None:
+                members.discard(prompt)
+                if not members:
+                    del self.postings[term]
+
+    def match(self, prompt: str, threshold: float, vocabulary: Optional[FrozenSet[str]] = None) -> Optional[NearDuplicateMatch]:
+        """
+        Best past prompt whose term similarity reaches the threshold and whose
+        numbers, guard words and grouping are the same. With a `vocabulary` (schema
+        terms), terms in only one of the two prompts must be schema names: a
+        differing filter value ("in canada") never matches.
+        """
+        features = PromptFeatures(prompt)
+        if not features.terms:
+            return None
+        candidates = set().union(*(self.postings.get(term, ()) for term in features.terms))
+        best: Optional[NearDuplicateMatch] = None
+        for candidate in candidates:
+            other, entry = self.entries[candidate]
+            if not features.compatible(other):
+                continue
+            if vocabulary is not None and not (features.terms ^ other.terms) <= vocabulary:
+                continue
+            similarity = jaccard(features.terms, other.terms)
+            if similarity >= threshold and (best is None or similarity > best.similarity):
+                best = NearDuplicateMatch(candidate, similarity, entry)
+        return best
+
+
+class NearDuplicateIndex:
+    """
+    Per-worker collection of PromptMatchers, one per schema fingerprint and tool-set version.
+    """
+    def __init__(self, max_fingerprints: int = 256, max_entries: int = 500):
+        self.max_fingerprints = max_fingerprints
+        self.max_entries = max_entries
+        self._matchers: "OrderedDict[str, PromptMatcher]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, prompt: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            matcher = self._matchers.get(key)
+            if matcher is None:
+                matcher = self._matchers[key] = PromptMatcher(self.max_entries)
+                while len(self._matchers) > self.max_fingerprints:
+                    self._matchers.popitem(last=False)
+            self._matchers.move_to_end(key)
+            matcher.add(prompt, entry)
+
+    def remove(self, key: str, prompt: str) -> None:
+        with self._lock:
+            matcher = self._matchers.get(key)
+            if matcher is not None:
+                matcher.remove(prompt)
+
+    def match(
+        self, key: str, prompt: str, threshold: float, vocabulary: Optional[FrozenSet[str]] = None,
+    ) -> Optional[NearDuplicateMatch]:
+        with self._lock:
+            matcher = self._matchers.get(key)
+            if matcher is None:
+                return None
+            return matcher.match(prompt, threshold, vocabulary)
+
+
+def schema_vocabulary(names: Iterable[str]) -> FrozenSet[str]:
+    """
+    Normalized terms of table and column names, for `PromptMatcher.match`.
+    """
+    return frozenset().union(*(prompt_terms(name) for name in names))
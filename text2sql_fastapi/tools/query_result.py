@@ -0,0 +1,72 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from fastapi.responses import JSONResponse
+
+"""
+Typed SQL result passed through the /chat pipeline as column names plus row
+tuples, serialized once with orjson when the response is rendered.
+"""
+
+
+def _default(value: Any) -> str:
+    # Decimal, bytes and driver-specific types orjson does not know
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """
+    orjson encoding shared by query responses, stream events and caches.
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class QueryJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, including Decimal and other database values.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class QueryResult:
+    """
+    Result of one query: column names and row tuples, or the error that stopped it.
+    """
+    def __init__(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        rows: Optional[Sequence[Tuple[Any, ...]]] = None,
+        error: Optional[str] = None,
+    ):
+        self.columns: List[str] = list(columns or [])
+        self.rows: List[Tuple[Any, ...]] = [tuple(row) for row in rows or []]
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Rows as dicts, for API responses and templates.
+        """
+        rows = self.rows if limit is None else self.rows[:limit]
+        return [dict(zip(self.columns, row)) for row in rows]
+
+    def column(self, index: int) -> List[Any]:
+        return [row[index] for row in self.rows]
+
+    def to_dict(self) -> Dict[str, Any]:
+        if not self.ok:
+            return {"error": self.error}
+        return {"columns": self.columns, "rows": self.rows}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QueryResult":
+        if "error" in data:
+            return cls(error=data["error"])
+        return cls(data["columns"], data["rows"])
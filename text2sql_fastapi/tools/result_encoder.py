@@ -0,0 +1,84 @@
+import json
+import math
+from decimal import Decimal
+from typing import Any, List, Sequence
+
+from tools.query_result import QueryResult
+
+"""
+Compact, token-budgeted encoding of SQL results for LLM prompts: one header row
+and tab-separated values instead of a JSON object per row, with rounded numbers,
+truncated long text and an "N more rows omitted" marker once the budget is spent.
+"""
+
+MAX_CELL_CHARS = 60
+SIGNIFICANT_DIGITS = 6
+# Rough Gemini tokenization of mixed text and numbers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate, good enough for budgeting prompt sections.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _number(value: float) -> str:
+    if math.isnan(value) or math.isinf(value):
+        return str(value)
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.{SIGNIFICANT_DIGITS}g}"
+
+
+def encode_cell(value: Any) -> str:
+    """
+    One cell as compact single-line text.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, (float, Decimal)):
+        return _number(float(value))
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, default=str, separators=(",", ":"))
+    # Text is kept as is, even when it looks numeric (codes, IDs, "1.10")
+    text = " ".join(str(value).split())
+    if len(text) > MAX_CELL_CHARS:
+        text = text[:MAX_CELL_CHARS - 1] + "…"
+    return text
+
+
+def encode_rows(columns: List[str], rows: Sequence[Sequence[Any]], max_tokens: int) -> str:
+    """
+    Encode rows as a header plus tab-separated lines within `max_tokens`.
+    """
+    if not rows:
+        return "(0 rows)"
+    lines = [f"({len(rows)} rows)", "\t".join(columns)]
+    used = sum(estimate_tokens(line) for line in lines)
+    for index, row in enumerate(rows):
+        line = "\t".join(encode_cell(value) for value in row)
+        cost = estimate_tokens(line)
+        if used + cost > max_tokens and index > 0:
+            lines.append(f"... {len(rows) - index} more rows omitted")
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
+
+
+def encode_result(result: QueryResult, max_tokens: int) -> str:
+    """
+    Compact form of a query result. Errors are passed through, cut to the budget.
+    """
+    if result.ok:
+        return encode_rows(result.columns, result.rows, max_tokens)
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(result.error) > max_chars:
+        return result.error[:max_chars] + " …"
+    return result.error
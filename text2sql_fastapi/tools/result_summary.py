@@ -0,0 +1,134 @@
+import math
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from tools.query_result import QueryResult
+
+try:
+    import numpy as np
+except ImportError:
+    # Optional: without numpy large results are sampled instead of summarized
+    np = None
+
+"""
+Vectorized statistical summary of large SQL results, so the refine step can
+answer from the whole result (counts, ranges, percentiles, top categories and
+time buckets per column) instead of a truncated sample of rows.
+"""
+
+TOP_K = 5
+PERCENTILES = (25, 50, 75)
+MAX_TIME_BUCKETS = 12
+
+_DATE_TEXT = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$")
+
+
+def _round(value: float) -> Any:
+    value = float(value)
+    if math.isnan(value) or math.isinf(value):
+        return None
+    if value.is_integer() and abs(value) < 1e15:
+        return int(value)
+    return float(f"{value:.6g}")
+
+
+def _is_number(value: Any) -> bool:
+    # Numeric-looking text (zip codes, IDs stored as strings) is a category, not a number
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, (int, float, Decimal))
+
+
+def _plain(value: Any) -> Any:
+    # Dates and naive timestamps in the ISO form numpy parses
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _numeric_stats(values: List[Any]) -> Dict[str, Any]:
+    array = np.asarray(values, dtype=float)
+    stats = {
+        "type": "numeric",
+        "min": _round(array.min()),
+        "max": _round(array.max()),
+        "mean": _round(array.mean()),
+        "sum": _round(array.sum()),
+    }
+    for percentile, value in zip(PERCENTILES, np.percentile(array, PERCENTILES)):
+        stats[f"p{percentile}"] = _round(value)
+    return stats
+
+
+def _time_stats(values: List[str]) -> Dict[str, Any]:
+    array = np.asarray([value.replace(" ", "T") for value in values], dtype="datetime64[s]")
+    low, high = array.min(), array.max()
+    span_days = (high - low) / np.timedelta64(1, "D")
+    # Coarsest unit that still splits the range into a handful of buckets
+    unit = "D" if span_days <= 62 else "M" if span_days <= 3 * 365 else "Y"
+    buckets, counts = np.unique(array.astype(f"datetime64[{unit}]"), return_counts=True)
+    if len(buckets) > MAX_TIME_BUCKETS:
+        order = np.argsort(counts)[::-1][:MAX_TIME_BUCKETS]
+        buckets, counts = buckets[np.sort(order)], counts[np.sort(order)]
+    return {
+        "type": "time",
+        "min": str(low),
+        "max": str(high),
+        "bucket": {"D": "day", "M": "month", "Y": "year"}[unit],
+        "buckets": {str(bucket): int(count) for bucket, count in zip(buckets, counts)},
+    }
+
+
+def _category_stats(values: List[Any]) -> Dict[str, Any]:
+    array = np.asarray([str(value) for value in values], dtype=object)
+    categories, counts = np.unique(array, return_counts=True)
+    order = np.argsort(counts, kind="stable")[::-1][:TOP_K]
+    return {
+        "type": "category",
+        "distinct": int(len(categories)),
+        "top": {str(categories[i])[:60]: int(counts[i]) for i in order},
+    }
+
+
+def summarize_result(result: QueryResult) -> Optional[Dict[str, Any]]:
+    """
+    Per-column statistics of a result, or None if numpy is not installed.
+    """
+    if np is None or not result.ok:
+        return None
+    summary: Dict[str, Any] = {"row_count": len(result), "columns": {}}
+    for index, column in enumerate(result.columns):
+        values = result.column(index)
+        present = [_plain(value) for value in values if value is not None]
+        if not present:
+            stats: Dict[str, Any] = {"type": "empty"}
+        elif all(_is_number(value) for value in present):
+            stats = _numeric_stats(present)
+        elif all(isinstance(value, str) and _DATE_TEXT.match(value) for value in present):
+            try:
+                stats = _time_stats(present)
+            except ValueError:
+                stats = _category_stats(present)
+        else:
+            stats = _category_stats(present)
+        stats["nulls"] = len(values) - len(present)
+        summary["columns"][column] = stats
+    return summary
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """
+    Compact text form of a summary for an LLM prompt.
+    """
+    lines = [f"{summary['row_count']} rows"]
+    for column, stats in summary["columns"].items():
+        details = ", ".join(
+            f"{key}={value}" for key, value in stats.items()
+            if key != "type" and not (key == "nulls" and value == 0)
+        )
+        lines.append(f"- {column} ({stats['type']}): {details}")
+    return "\n".join(lines)
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from agno.utils.log import logger
+
+from tools.schema_reflector import DatabaseSchema
+from tools.text_index import BM25Index, tokenize
+
+"""
+Relevance index over a reflected schema, used to send only the tables a prompt
+needs to the LLM instead of the whole database.
+"""
+
+# Table names count more than column names when ranking
+TABLE_NAME_WEIGHT = 3
+# Score share a join neighbour inherits from the table that pulled it in
+NEIGHBOUR_DECAY = 0.5
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough LLM token estimate (about four characters per token).
+    """
+    return len(text) // 4 + 1
+
+
+class SchemaIndex:
+    """
+    BM25 index over table names, column names and comments, with foreign-key
+    neighbours for join-graph expansion.
+    """
+    def __init__(self, db_schema: DatabaseSchema):
+        self.db_schema = db_schema
+
+        documents: Dict[str, List[str]] = {}
+        self.neighbours: Dict[str, Set[str]] = {name: set() for name in db_schema.tables}
+        for name, table in db_schema.tables.items():
+            tokens = tokenize(name) * TABLE_NAME_WEIGHT + tokenize(table.comment)
+            for column in table.columns:
+                tokens += tokenize(column.name) + tokenize(column.comment)
+            documents[name] = tokens
+            for fk in table.foreign_keys:
+                if fk.referred_table in self.neighbours and fk.referred_table != name:
+                    self.neighbours[name].add(fk.referred_table)
+                    self.neighbours[fk.referred_table].add(name)
+        self.index = BM25Index(documents)
+        self.table_tokens: Dict[str, int] = {
+            name: estimate_tokens(db_schema.to_prompt([name])) for name in db_schema.tables
+        }
+
+    def select_tables(self, prompt: str, top_k: int = 8, token_budget: int = 4000) -> Optional[List[str]]:
+        """
+        Pick the tables most relevant to a prompt: the top-k BM25 matches followed by
+        their foreign-key neighbours, in score order, until the token budget is spent.
+        Returns None when nothing matches, meaning the caller should use the full schema.
+        """
+        ranked = self.index.search(tokenize(prompt), top_k=top_k)
+        if not ranked:
+            return None
+
+        scores: Dict[str, float] = dict(ranked)
+        for name, score in ranked:
+            for neighbour in self.neighbours[name]:
+                inherited = score * NEIGHBOUR_DECAY
+                if scores.get(neighbour, 0.0) < inherited:
+                    scores[neighbour] = inherited
+
+        selected: List[str] = []
+        used = 0
+        for name, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            cost = self.table_tokens[name]
+            if selected and used + cost > token_budget:
+                continue
+            selected.append(name)
+            used += cost
+        return selected
+
+
+_index_cache: "OrderedDict[str, SchemaIndex]" = OrderedDict()
+_index_lock = threading.Lock()
+MAX_CACHED_INDEXES = 64
+
+
+def get_schema_index(db_schema: DatabaseSchema) -> SchemaIndex:
+    """
+    Return the index for a schema, reusing the one built for the same fingerprint.
+    """
+    key = db_schema.fingerprint
+    if key is None:
+        return SchemaIndex(db_schema)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+    index = SchemaIndex(db_schema)
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > MAX_CACHED_INDEXES:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def select_prompt_tables(
+    db_schema: DatabaseSchema, prompt: str, top_k: int, token_budget: int, min_tables: int
+) -> Optional[List[str]]:
+    """
+    Choose the tables to include in a prompt. Returns None, meaning the full schema,
+    for small schemas, prompts that match no table and indexing errors.
+    """
+    if len(db_schema.tables) < min_tables:
+        return None
+    try:
+        return get_schema_index(db_schema).select_tables(prompt, top_k=top_k, token_budget=token_budget)
+    except Exception as e:
+        logger.warning(f"Schema pruning failed, using full schema: {e}")
+        return None
@@ -0,0 +1,284 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+from agno.utils.log import log_debug
+from pydantic import BaseModel
+
+try:
+    from sqlalchemy import Connection
+    from sqlalchemy.inspection import inspect
+    from sqlalchemy.sql.expression import text
+except ImportError:
+    raise ImportError("`sqlalchemy` not installed")
+
+"""
+Bulk schema reflection for customer databases.
+Reads every table, column, primary key and foreign key in two catalog queries
+instead of one inspector round trip per table, plus a cheap probe for schema changes.
+"""
+
+
+class ColumnInfo(BaseModel):
+    """
+    A single table column.
+    """
+    name: str
+    type: str
+    nullable: bool = True
+    comment: Optional[str] = None
+
+
+class ForeignKeyInfo(BaseModel):
+    """
+    A foreign key from one or more columns to another table.
+    """
+    columns: List[str]
+    referred_table: str
+    referred_columns: List[str]
+
+
+class TableInfo(BaseModel):
+    """
+    Reflected structure of one table.
+    """
+    name: str
+    comment: Optional[str] = None
+    columns: List[ColumnInfo] = []
+    primary_key: List[str] = []
+    foreign_keys: List[ForeignKeyInfo] = []
+
+
+class DatabaseSchema(BaseModel):
+    """
+    Compact structured schema of a customer database, shared by every /chat code path.
+    """
+    dialect: str
+    tables: Dict[str, TableInfo] = {}
+    # Identifies the database and the version of its schema, set by the schema cache
+    fingerprint: Optional[str] = None
+
+    @property
+    def table_names(self) -> List[str]:
+        return list(self.tables.keys())
+
+    def describe(self, table_name: str) -> List[dict]:
+        """
+        Return a table's columns in the same shape as `SQLTools.describe_table`.
+        """
+        table = self.tables[table_name]
+        return [column.model_dump(exclude={"comment"}) for column in table.columns]
+
+    def to_prompt(self, table_names: Optional[Iterable[str]] = None) -> str:
+        """
+        Render the schema (or a subset of its tables) as compact prompt text.
+        """
+        lines = []
+        for name in table_names if table_names is not None else self.tables:
+            table = self.tables.get(name)
+            if table is None:
+                continue
+            references = {}
+            for fk in table.foreign_keys:
+                for column, referred in zip(fk.columns, fk.referred_columns):
+                    references[column] = f"{fk.referred_table}.{referred}"
+            columns = []
+            for column in table.columns:
+                parts = [column.name, column.type]
+                if column.name in table.primary_key:
+                    parts.append("PK")
+                elif not column.nullable:
+                    parts.append("NOT NULL")
+                if column.name in references:
+                    parts.append(f"-> {references[column.name]}")
+                columns.append(" ".join(parts))
+            lines.append(f"Table: {name}\nColumns: {', '.join(columns)}")
+        return "\n".join(lines)
+
+
+_POSTGRES_COLUMNS = text("""
+    SELECT c.relname, a.attname, pg_catalog.format_type(a.atttypid, a.atttypmod), NOT a.attnotnull,
+           pg_catalog.col_description(c.oid, a.attnum), pg_catalog.obj_description(c.oid, 'pg_class')
+    FROM pg_catalog.pg_attribute a
+    JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p')
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+      AND n.nspname = COALESCE(:schema, current_schema())
+    ORDER BY c.relname, a.attnum
+""")
+
+_POSTGRES_KEYS = text("""
+    SELECT con.contype::text, con.conname, rel.relname, att.attname, frel.relname, fatt.attname
+    FROM pg_catalog.pg_constraint con
+    JOIN pg_catalog.pg_class rel ON rel.oid = con.conrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = rel.relnamespace
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, fattnum, ord)
+    JOIN pg_catalog.pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = k.attnum
+    LEFT JOIN pg_catalog.pg_class frel ON frel.oid = con.confrelid
+    LEFT JOIN pg_catalog.pg_attribute fatt ON fatt.attrelid = con.confrelid AND fatt.attnum = k.fattnum
+    WHERE con.contype IN ('p', 'f')
+      AND n.nspname = COALESCE(:schema, current_schema())
+    ORDER BY rel.relname, con.conname, k.ord
+""")
+
+_MYSQL_COLUMNS = text("""
+    SELECT c.TABLE_NAME, c.COLUMN_NAME, c.COLUMN_TYPE, c.IS_NULLABLE = 'YES',
+           NULLIF(c.COLUMN_COMMENT, ''), NULLIF(t.TABLE_COMMENT, '')
+    FROM information_schema.COLUMNS c
+    JOIN information_schema.TABLES t
+      ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+    WHERE c.TABLE_SCHEMA = COALESCE(:schema, DATABASE())
+      AND t.TABLE_TYPE = 'BASE TABLE'
+    ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+""")
+
+_MYSQL_KEYS = text("""
+    SELECT CASE WHEN k.CONSTRAINT_NAME = 'PRIMARY' THEN 'p' ELSE 'f' END,
+           k.CONSTRAINT_NAME, k.TABLE_NAME, k.COLUMN_NAME,
+           k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME
+    FROM information_schema.KEY_COLUMN_USAGE k
+    WHERE k.TABLE_SCHEMA = COALESCE(:schema, DATABASE())
+      AND (k.CONSTRAINT_NAME = 'PRIMARY' OR k.REFERENCED_TABLE_NAME IS NOT NULL)
+    ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION
+""")
+
+_POSTGRES_VERSION = text("""
+    SELECT md5(COALESCE(string_agg(
+               c.oid::text || n.nspname || '.' || c.relname || a.attname
+                   || a.atttypid::text || a.atttypmod::text || a.attnotnull::text,
+               ',' ORDER BY c.oid, a.attnum), ''))
+        || (SELECT md5(COALESCE(string_agg(con.oid::text, ',' ORDER BY con.oid), ''))
+            FROM pg_catalog.pg_constraint con
+            JOIN pg_catalog.pg_namespace cn ON cn.oid = con.connamespace
+            WHERE cn.nspname = COALESCE(:schema, current_schema()))
+    FROM pg_catalog.pg_attribute a
+    JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p')
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+      AND n.nspname = COALESCE(:schema, current_schema())
+""")
+
+_MYSQL_VERSION = text("""
+    SELECT CONCAT(
+        (SELECT CONCAT(COUNT(*), ':', COALESCE(SUM(CRC32(CONCAT_WS(':',
+                    TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY))), 0))
+         FROM information_schema.COLUMNS
+         WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE())),
+        '/',
+        -- Keys on already indexed columns do not change COLUMN_KEY
+        (SELECT CONCAT(COUNT(*), ':', COALESCE(SUM(CRC32(CONCAT_WS(':',
+                    TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, ORDINAL_POSITION,
+                    REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME))), 0))
+         FROM information_schema.KEY_COLUMN_USAGE
+         WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE()))
+    )
+""")
+
+_SQLITE_VERSION = text("PRAGMA schema_version")
+
+# backend name -> (columns query, keys query)
+_CATALOG_QUERIES = {
+    "postgresql": (_POSTGRES_COLUMNS, _POSTGRES_KEYS),
+    "mysql": (_MYSQL_COLUMNS, _MYSQL_KEYS),
+    "mariadb": (_MYSQL_COLUMNS, _MYSQL_KEYS),
+}
+
+
+# backend name -> query returning a value that changes whenever the schema does
+_VERSION_QUERIES = {
+    "postgresql": _POSTGRES_VERSION,
+    "mysql": _MYSQL_VERSION,
+    "mariadb": _MYSQL_VERSION,
+    "sqlite": _SQLITE_VERSION,
+}
+
+
+def _reflect_from_catalog(conn: Connection, schema: Optional[str], dialect: str) -> DatabaseSchema:
+    columns_query, keys_query = _CATALOG_QUERIES[dialect]
+    tables: Dict[str, TableInfo] = {}
+    rows = conn.execute(columns_query, {"schema": schema})
+    for table_name, column_name, column_type, nullable, column_comment, table_comment in rows:
+        table = tables.setdefault(table_name, TableInfo(name=table_name, comment=table_comment))
+        table.columns.append(
+            ColumnInfo(name=column_name, type=column_type, nullable=bool(nullable), comment=column_comment)
+        )
+
+    foreign_keys: Dict[tuple, ForeignKeyInfo] = {}
+    for kind, name, table_name, column_name, referred_table, referred_column in conn.execute(keys_query, {"schema": schema}):
+        table = tables.get(table_name)
+        if table is None:
+            continue
+        if kind == "p":
+            table.primary_key.append(column_name)
+            continue
+        fk = foreign_keys.get((table_name, name))
+        if fk is None:
+            fk = ForeignKeyInfo(columns=[], referred_table=referred_table, referred_columns=[])
+            foreign_keys[(table_name, name)] = fk
+            table.foreign_keys.append(fk)
+        fk.columns.append(column_name)
+        fk.referred_columns.append(referred_column)
+    return DatabaseSchema(dialect=dialect, tables=tables)
+
+
+def _reflect_with_inspector(conn: Connection, schema: Optional[str], dialect: str) -> DatabaseSchema:
+    # One inspector and the multi-table APIs, so there is still no per-table round trip
+    inspector = inspect(conn)
+    columns = inspector.get_multi_columns(schema=schema)
+    primary_keys = inspector.get_multi_pk_constraint(schema=schema)
+    foreign_keys = inspector.get_multi_foreign_keys(schema=schema)
+
+    tables: Dict[str, TableInfo] = {}
+    for key, table_columns in sorted(columns.items(), key=lambda item: item[0][1]):
+        table_name = key[1]
+        tables[table_name] = TableInfo(
+            name=table_name,
+            columns=[
+                ColumnInfo(
+                    name=column["name"],
+                    type=str(column["type"]),
+                    nullable=column["nullable"],
+                    comment=column.get("comment"),
+                )
+                for column in table_columns
+            ],
+            primary_key=(primary_keys.get(key) or {}).get("constrained_columns") or [],
+            foreign_keys=[
+                ForeignKeyInfo(
+                    columns=fk["constrained_columns"],
+                    referred_table=fk["referred_table"],
+                    referred_columns=fk["referred_columns"],
+                )
+                for fk in foreign_keys.get(key) or []
+            ],
+        )
+    return DatabaseSchema(dialect=dialect, tables=tables)
+
+
+def reflect_schema(conn: Connection, schema: Optional[str] = None) -> DatabaseSchema:
+    """
+    Reflect every table of a database in bulk. Uses the system catalog directly on
+    PostgreSQL and MySQL, and SQLAlchemy's multi-table inspector on other dialects.
+    Takes a sync connection so it can also run through `AsyncConnection.run_sync`.
+    """
+    dialect = conn.dialect.name
+    log_debug(f"Reflecting {dialect} schema in bulk")
+    if dialect in _CATALOG_QUERIES:
+        return _reflect_from_catalog(conn, schema, dialect)
+    return _reflect_with_inspector(conn, schema, dialect)
+
+
+def probe_schema_version(conn: Connection, schema: Optional[str] = None) -> Optional[str]:
+    """
+    Cheap staleness probe: a single-row catalog query whose value changes whenever
+    tables, columns or constraints change. Returns None if the dialect has no probe.
+    """
+    query = _VERSION_QUERIES.get(conn.dialect.name)
+    if query is None:
+        return None
+    params = {} if conn.dialect.name == "sqlite" else {"schema": schema}
+    version = conn.execute(query, params).scalar()
+    return hashlib.sha1(str(version).encode("utf-8")).hexdigest()[:16]
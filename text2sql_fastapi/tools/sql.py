@@ -1,23 +1,82 @@
 import json
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from agno.tools import Toolkit
 from agno.utils.log import log_debug, logger
 
 try:
-    from sqlalchemy import Engine, create_engine
+    from sqlalchemy import Engine
     from sqlalchemy.inspection import inspect
     from sqlalchemy.orm import Session, sessionmaker
     from sqlalchemy.sql.expression import text
 except ImportError:
     raise ImportError("`sqlalchemy` not installed")
 
+from tools.cost_guard import CostEstimate, explain_statement, parse_explain
+from tools.engine_registry import engine_registry
+from tools.query_result import QueryResult
+from tools.schema_reflector import DatabaseSchema, probe_schema_version, reflect_schema
+from tools.sql_validator import push_down_limit
+
 
 """
 Toolkit for SQL database operations, including listing tables, describing tables, and running queries.
 Used for text-to-SQL conversion and database schema inspection.
 """
 
+
+def statement_timeout_sql(dialect: Any, timeout_ms: Optional[int]) -> Optional[str]:
+    """
+    Statement that caps query run time for the rest of the session's transaction,
+    or None if the dialect has no transaction-scoped setting (see `with_statement_timeout`).
+    """
+    if not timeout_ms:
+        return None
+    if dialect.name == "postgresql":
+        return f"SET LOCAL statement_timeout = {int(timeout_ms)}"
+    return None
+
+
+def _main_select_start(sql: str) -> Optional[int]:
+    # Offset of the SELECT keyword of the outermost query block (after any WITH),
+    # skipping quoted text and parenthesized subqueries and CTE bodies
+    depth, quote, i = 0, None, 0
+    while i < len(sql):
+        char = sql[i]
+        if quote is not None:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and sql[i:i + 6].lower() == "select" and (i == 0 or not (sql[i - 1].isalnum() or sql[i - 1] == "_")) \
+                and not (sql[i + 6:i + 7].isalnum() or sql[i + 6:i + 7] == "_"):
+            return i
+        i += 1
+    return None
+
+
+def with_statement_timeout(dialect: Any, sql: str, timeout_ms: Optional[int]) -> str:
+    """
+    Cap a MySQL or MariaDB query's run time in the statement itself, so no session
+    setting outlives it on a pooled connection: MariaDB's SET STATEMENT ... FOR,
+    MySQL's MAX_EXECUTION_TIME hint on the outermost SELECT. Other dialects and
+    statements without a SELECT to hint are returned unchanged.
+    """
+    if not timeout_ms or dialect.name != "mysql":
+        return sql
+    timeout_ms = int(timeout_ms)
+    if getattr(dialect, "is_mariadb", False):
+        return f"SET STATEMENT max_statement_time = {timeout_ms / 1000:.3f} FOR {sql}"
+    start = _main_select_start(sql)
+    if start is None:
+        return sql
+    return f"{sql[:start + 6]} /*+ MAX_EXECUTION_TIME({timeout_ms}) */{sql[start + 6:]}"
+
+
 class SQLTools(Toolkit):
     """
     Toolkit for interacting with SQL databases: list tables, describe tables, and run SQL queries.
@@ -36,17 +95,18 @@ class SQLTools(Toolkit):
         list_tables: bool = True,
         describe_table: bool = True,
         run_sql_query: bool = True,
+        statement_timeout_ms: Optional[int] = None,
         **kwargs,
     ):
-        # Get the database engine
+        # Get the database engine, reusing the pooled engine for this URL if one exists
         _engine: Optional[Engine] = db_engine
         if _engine is None and db_url is not None:
-            _engine = create_engine(db_url)
+            _engine = engine_registry.get_engine(db_url)
         elif user and password and host and port and dialect:
             if schema is not None:
-                _engine = create_engine(f"{dialect}://{user}:{password}@{host}:{port}/{schema}")
+                _engine = engine_registry.get_engine(f"{dialect}://{user}:{password}@{host}:{port}/{schema}")
             else:
-                _engine = create_engine(f"{dialect}://{user}:{password}@{host}:{port}")
+                _engine = engine_registry.get_engine(f"{dialect}://{user}:{password}@{host}:{port}")
 
         if _engine is None:
             raise ValueError("Could not build the database connection")
@@ -57,6 +117,9 @@ class SQLTools(Toolkit):
 
         self.schema = schema
 
+        # Per-statement time limit applied to every session that runs a query
+        self.statement_timeout_ms = statement_timeout_ms
+
         # Tables this toolkit can access
         self.tables: Optional[Dict[str, Any]] = tables
 
@@ -116,6 +179,28 @@ class SQLTools(Toolkit):
             logger.error(f"Error getting table schema: {e}")
             return f"Error getting table schema: {e}"
 
+    def reflect_schema(self) -> DatabaseSchema:
+        """Reflect every table, column, primary key and foreign key in bulk.
+
+        Returns:
+            DatabaseSchema: structured schema of the database.
+        """
+        with self.db_engine.connect() as conn:
+            return reflect_schema(conn, schema=self.schema)
+
+    def schema_version(self) -> Optional[str]:
+        """Probe a short hash that changes whenever the database schema changes.
+
+        Returns:
+            Optional[str]: schema version, or None if the dialect cannot be probed.
+        """
+        try:
+            with self.db_engine.connect() as conn:
+                return probe_schema_version(conn, schema=self.schema)
+        except Exception as e:
+            logger.error(f"Error probing schema version: {e}")
+            return None
+
     def run_sql_query(self, query: str, limit: Optional[int] = 10) -> str:
         """Use this function to run a SQL query and return the result.
 
@@ -134,9 +219,89 @@ class SQLTools(Toolkit):
             logger.error(f"Error running query: {e}")
             return f"Error running query: {e}"
 
+    def run_query(self, query: str, limit: Optional[int] = 10) -> QueryResult:
+        """Run a SQL query and return its columns and row tuples.
+
+        Args:
+            query (str): The query to run.
+            limit (int, optional): The number of rows to return. Defaults to 10. Use `None` to show all results.
+        Returns:
+            QueryResult: Columns and rows, or the error message.
+        """
+        dialect = self.db_engine.dialect
+        sql = with_statement_timeout(dialect, push_down_limit(query, limit, dialect.name), self.statement_timeout_ms)
+        log_debug(f"Running sql |\n{sql}")
+
+        try:
+            with self.Session() as sess, sess.begin():
+                timeout_sql = statement_timeout_sql(dialect, self.statement_timeout_ms)
+                if timeout_sql is not None:
+                    sess.execute(text(timeout_sql))
+                result = sess.execute(text(sql))
+                if not result.returns_rows:
+                    return QueryResult()
+                rows = result.fetchmany(limit) if limit else result.fetchall()
+                return QueryResult(list(result.keys()), rows)
+        except Exception as e:
+            logger.error(f"Error running query: {e}")
+            return QueryResult(error=f"Error running query: {e}")
+
+    def explain_query(self, query: str, limit: Optional[int] = 10) -> Optional[CostEstimate]:
+        """Estimate the cost of a SQL query with EXPLAIN, without running it.
+
+        Args:
+            query (str): The query to estimate.
+            limit (int, optional): The row limit it will run with, pushed down as in `run_query`.
+        Returns:
+            CostEstimate: The planner's estimate, or None if the dialect or plan cannot be read.
+        """
+        dialect = self.db_engine.dialect
+        explain_sql = explain_statement(dialect, push_down_limit(query, limit, dialect.name))
+        if explain_sql is None:
+            return None
+
+        try:
+            with self.Session() as sess, sess.begin():
+                timeout_sql = statement_timeout_sql(dialect, self.statement_timeout_ms)
+                if timeout_sql is not None:
+                    sess.execute(text(timeout_sql))
+                return parse_explain(dialect, sess.execute(text(explain_sql)).fetchall())
+        except Exception as e:
+            logger.warning(f"Error explaining query: {e}")
+            return None
+
+    def stream_query(self, query: str, batch_size: int = 1000) -> Iterator[Tuple[List[str], List[Tuple[Any, ...]]]]:
+        """Run a SQL query on a server-side cursor, yielding its rows in batches.
+
+        Args:
+            query (str): The query to run.
+            batch_size (int): Rows fetched from the database per batch.
+        Returns:
+            Iterator: `(columns, rows)` per batch; only `batch_size` rows are held at a time.
+        """
+        query = with_statement_timeout(self.db_engine.dialect, query, self.statement_timeout_ms)
+        log_debug(f"Streaming sql |\n{query}")
+
+        with self.db_engine.connect() as conn, conn.begin():
+            timeout_sql = statement_timeout_sql(self.db_engine.dialect, self.statement_timeout_ms)
+            if timeout_sql is not None:
+                conn.execute(text(timeout_sql))
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(text(query))
+            columns = list(result.keys())
+            empty = True
+            for partition in result.partitions(batch_size):
+                empty = False
+                yield columns, [tuple(row) for row in partition]
+            if empty:
+                # Still report the columns of an empty result
+                yield columns, []
+
     def run_sql(self, sql: str, limit: Optional[int] = None) -> List[dict]:
         """Internal function to run a sql query.
 
+        The limit is pushed into the statement so the database stops early, and the
+        statement timeout is applied to the transaction or the statement itself.
+
         Args:
             sql (str): The sql query to run.
             limit (int, optional): The number of rows to return. Defaults to None.
@@ -144,9 +309,14 @@ class SQLTools(Toolkit):
         Returns:
             List[dict]: The result of the query.
         """
+        dialect = self.db_engine.dialect
+        sql = with_statement_timeout(dialect, push_down_limit(sql, limit, dialect.name), self.statement_timeout_ms)
         log_debug(f"Running sql |\n{sql}")
 
         with self.Session() as sess, sess.begin():
+            timeout_sql = statement_timeout_sql(dialect, self.statement_timeout_ms)
+            if timeout_sql is not None:
+                sess.execute(text(timeout_sql))
             result = sess.execute(text(sql))
 
             # Check if the operation has returned rows.
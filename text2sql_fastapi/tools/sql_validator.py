@@ -0,0 +1,249 @@
+import difflib
+import re
+from typing import Dict, List, Optional, Set
+
+from tools.schema_reflector import DatabaseSchema
+
+try:
+    import sqlglot
+    from sqlglot import exp
+    from sqlglot.errors import SqlglotError
+except ImportError:
+    # Optional: without sqlglot only the statement type is checked
+    sqlglot = None
+
+"""
+Local parse, validate and repair of generated SQL against the cached schema.
+Rejects anything but a single read-only query, resolves tables and columns,
+and fixes identifier case so bad SQL never reaches the customer database.
+"""
+
+# SQLAlchemy dialect name -> sqlglot dialect
+SQLGLOT_DIALECTS = {
+    "postgresql": "postgres",
+    "mysql": "mysql",
+    "mariadb": "mysql",
+    "sqlite": "sqlite",
+    "mssql": "tsql",
+    "oracle": "oracle",
+    "snowflake": "snowflake",
+    "bigquery": "bigquery",
+    "duckdb": "duckdb",
+}
+
+# Functions a SELECT can call to sleep, change settings or sequences, touch files,
+# large objects or other sessions, reach other servers or run SQL passed as text
+DENIED_FUNCTIONS = frozenset({
+    # PostgreSQL
+    "pg_sleep", "pg_sleep_for", "pg_sleep_until", "pg_terminate_backend", "pg_cancel_backend",
+    "pg_reload_conf", "pg_rotate_logfile", "pg_promote", "pg_switch_wal", "pg_create_restore_point",
+    "pg_read_file", "pg_read_binary_file", "pg_ls_dir", "pg_stat_file", "pg_file_write",
+    "pg_advisory_lock", "pg_advisory_xact_lock", "pg_advisory_lock_shared", "pg_try_advisory_lock",
+    "pg_notify", "set_config", "nextval", "setval",
+    "lo_import", "lo_export", "lo_unlink", "lo_create", "lo_from_bytea", "lo_put",
+    "dblink", "dblink_exec", "dblink_connect", "dblink_send_query",
+    "query_to_xml", "query_to_xml_and_xmlschema", "query_to_xmlschema", "cursor_to_xml",
+    # MySQL / MariaDB
+    "sleep", "benchmark", "load_file", "get_lock", "release_lock", "release_all_locks",
+    "master_pos_wait", "source_pos_wait", "sys_exec", "sys_eval",
+    # SQLite
+    "load_extension", "readfile", "writefile", "edit", "fts3_tokenizer",
+})
+
+_DENIED_CALL = re.compile(r"\b(" + "|".join(sorted(DENIED_FUNCTIONS)) + r")\s*\(", re.IGNORECASE)
+
+_SIMPLE_IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+class SQLValidation:
+    """
+    Outcome of validating one statement: the (possibly repaired) SQL, the problem
+    that makes it unusable if any, and the repairs that were applied.
+    """
+    def __init__(self, sql: Optional[str], problem: Optional[str] = None, repairs: Optional[List[str]] = None):
+        self.sql = sql
+        self.problem = problem
+        self.repairs = repairs or []
+
+
+def _write_node_types() -> tuple:
+    # Lock is SELECT ... FOR UPDATE/SHARE (row locks), Into is SELECT ... INTO (creates a table)
+    names = ("Insert", "Update", "Delete", "Merge", "Create", "Drop", "Alter", "AlterTable", "Command", "TruncateTable", "Grant", "Lock", "Into")
+    return tuple(getattr(exp, name) for name in names if hasattr(exp, name))
+
+
+def _read_root_types() -> tuple:
+    return (exp.Select, exp.Union, exp.Intersect, exp.Except)
+
+
+def _identifier(name: str) -> "exp.Identifier":
+    return exp.to_identifier(name, quoted=not _SIMPLE_IDENTIFIER.match(name))
+
+
+def _suggest(name: str, candidates: List[str]) -> str:
+    close = difflib.get_close_matches(name.lower(), [c.lower() for c in candidates], n=1)
+    if not close:
+        return ""
+    match = next(c for c in candidates if c.lower() == close[0])
+    return f" Did you mean {match}?"
+
+
+def _check_statement_type(sql: str) -> Optional[str]:
+    if not re.match(r"^\s*(select|with)\b", sql, re.IGNORECASE):
+        return "Only a single SELECT query is allowed."
+    if ";" in sql.rstrip().rstrip(";"):
+        return "Only a single statement is allowed."
+    denied = _DENIED_CALL.search(sql)
+    if denied:
+        return f"Function {denied.group(1).lower()} is not allowed."
+    return None
+
+
+def _denied_function(tree: "exp.Expression") -> Optional[str]:
+    # Unknown functions parse as Anonymous with their name as written; known ones by their SQL name
+    for node in tree.find_all(exp.Func):
+        name = (node.name if isinstance(node, exp.Anonymous) else node.sql_name()).lower()
+        if name in DENIED_FUNCTIONS:
+            return name
+    return None
+
+
+def validate_sql(sql: str, db_schema: Optional[DatabaseSchema] = None) -> SQLValidation:
+    """
+    Validate a generated statement and repair identifier case against the schema.
+    """
+    sql = sql.strip()
+    if sqlglot is None or db_schema is None:
+        return SQLValidation(sql, _check_statement_type(sql))
+
+    dialect = SQLGLOT_DIALECTS.get(db_schema.dialect)
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read=dialect) if statement is not None]
+    except SqlglotError as e:
+        return SQLValidation(sql, f"Syntax error: {str(e).splitlines()[0]}")
+    if len(statements) != 1:
+        return SQLValidation(sql, "Only a single statement is allowed.")
+    tree = statements[0]
+    if not isinstance(tree, _read_root_types()) or any(isinstance(node, _write_node_types()) for node in tree.walk()):
+        return SQLValidation(sql, "Only a single SELECT query is allowed.")
+    denied = _denied_function(tree)
+    if denied is not None:
+        return SQLValidation(sql, f"Function {denied} is not allowed.")
+
+    tables = {table.name.lower(): table for table in db_schema.tables.values()}
+    derived: Set[str] = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+    derived |= {subquery.alias_or_name.lower() for subquery in tree.find_all(exp.Subquery) if subquery.alias_or_name}
+    repairs: List[str] = []
+
+    # Tables: resolve against the schema, fixing case; map aliases to schema tables
+    sources: Dict[str, str] = {}
+    for node in tree.find_all(exp.Table):
+        name = node.name
+        if not name or name.lower() in derived:
+            continue
+        table = tables.get(name.lower())
+        if table is None:
+            return SQLValidation(sql, f"Unknown table: {name}.{_suggest(name, list(db_schema.table_names))}")
+        if name != table.name:
+            node.set("this", _identifier(table.name))
+            repairs.append(f"table {name} -> {table.name}")
+        sources[node.alias_or_name.lower()] = table.name.lower()
+        sources[table.name.lower()] = table.name.lower()
+
+    # Columns: resolve qualified columns against their table, unqualified ones against every table in the query
+    output_names = {
+        projection.alias.lower()
+        for select in tree.find_all(exp.Select)
+        for projection in select.expressions
+        if projection.alias
+    }
+    queried = [tables[name] for name in dict.fromkeys(sources.values())]
+    for node in tree.find_all(exp.Column):
+        name = node.name
+        if not name or isinstance(node.this, exp.Star):
+            continue
+        qualifier = node.table.lower() if node.table else None
+        if qualifier is not None:
+            if qualifier not in sources:
+                continue
+            candidates = [tables[sources[qualifier]]]
+        else:
+            candidates = queried
+        matches = [
+            column.name
+            for table in candidates
+            for column in table.columns
+            if column.name.lower() == name.lower()
+        ]
+        if not matches:
+            # Aliases and derived-table columns are not in the schema
+            if qualifier is None and (name.lower() in output_names or derived):
+                continue
+            known = [column.name for table in candidates for column in table.columns]
+            where = f"{candidates[0].name}." if qualifier is not None else ""
+            return SQLValidation(sql, f"Unknown column: {where}{name}.{_suggest(name, known)}")
+        if name not in matches:
+            node.set("this", _identifier(matches[0]))
+            repair = f"column {name} -> {matches[0]}"
+            if repair not in repairs:
+                repairs.append(repair)
+
+    if repairs:
+        sql = tree.sql(dialect=dialect)
+    return SQLValidation(sql, None, repairs)
+
+
+def literal_limit(tree: "exp.Expression") -> Optional[int]:
+    """
+    Row count of a query's LIMIT or FETCH: None without one, -1 if it is not a literal.
+    """
+    clause = tree.args.get("limit") or tree.args.get("fetch")
+    if clause is None:
+        return None
+    count = clause.args.get("count") if isinstance(clause, exp.Fetch) else clause.expression
+    if isinstance(count, exp.Literal) and not count.is_string and count.this.isdigit():
+        return int(count.this)
+    return -1
+
+
+def query_limit(sql: str, dialect: Optional[str] = None) -> Optional[int]:
+    """
+    Literal row limit of a query (see `literal_limit`), or None if it has none or
+    cannot be parsed. `dialect` is the SQLAlchemy dialect name.
+    """
+    if sqlglot is None:
+        return None
+    try:
+        return literal_limit(sqlglot.parse_one(sql, read=SQLGLOT_DIALECTS.get(dialect)))
+    except SqlglotError:
+        return None
+
+
+def push_down_limit(sql: str, limit: Optional[int], dialect: Optional[str] = None) -> str:
+    """
+    Rewrite a read-only query so the database itself stops after `limit` rows,
+    keeping any smaller limit the query already has. `dialect` is the SQLAlchemy
+    dialect name. Statements that cannot be parsed are returned unchanged.
+    """
+    if not limit or sqlglot is None:
+        return sql
+    read = SQLGLOT_DIALECTS.get(dialect)
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read=read) if statement is not None]
+    except SqlglotError:
+        return sql
+    if len(statements) != 1 or not isinstance(statements[0], _read_root_types()):
+        return sql
+    tree = statements[0]
+    if tree.find(exp.Placeholder, exp.Parameter) is not None:
+        # Regenerating would change the bind parameter style
+        return sql
+    existing = literal_limit(tree)
+    if existing is not None and 0 <= existing <= limit:
+        return sql
+    if existing is None:
+        tree = tree.limit(limit)
+    else:
+        # Keep the query's own limit (or offset/fetch) and cap the rows around it
+        tree = exp.select("*").from_(tree.subquery("limited_query")).limit(limit)
+    return tree.sql(dialect=read)
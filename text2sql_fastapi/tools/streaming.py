@@ -0,0 +1,85 @@
+import asyncio
+import csv
+import io
+import threading
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Sequence
+
+from tools.query_result import dumps
+
+"""
+Helpers for streaming responses: consume blocking iterators (such as streamed
+LLM output) from async code, and encode events as SSE or NDJSON and row
+batches as NDJSON or CSV.
+"""
+
+SSE_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+_DONE = object()
+
+
+async def iterate_in_thread(
+    factory: Callable[[], Iterable[Any]],
+    max_buffered: int = 64,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[Any]:
+    """
+    Run a blocking iterator in a worker thread and yield its items without blocking
+    the event loop. The thread stops producing once `max_buffered` items are waiting.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+    cancelled = threading.Event()
+
+    def produce():
+        try:
+            for item in factory():
+                if cancelled.is_set():
+                    return
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+            asyncio.run_coroutine_threadsafe(queue.put(_DONE), loop).result()
+        except BaseException as e:
+            if not cancelled.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(e), loop).result()
+
+    loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+        # Unblock a producer waiting on a full queue; it stops at its next item
+        while not queue.empty():
+            queue.get_nowait()
+
+
+def encode_event(event: str, data: Any, media_type: str = SSE_MEDIA_TYPE) -> str:
+    """
+    Encode one event as an SSE frame or an NDJSON line.
+    """
+    if media_type == NDJSON_MEDIA_TYPE:
+        return dumps({"event": event, "data": data}).decode("utf-8") + "\n"
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+
+def encode_ndjson_rows(columns: List[str], rows: Iterable[Sequence[Any]]) -> bytes:
+    """
+    Encode a batch of rows as NDJSON objects, one per line.
+    """
+    return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def encode_csv_rows(rows: Iterable[Sequence[Any]]) -> str:
+    """
+    Encode a batch of rows (or a header) as CSV lines.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
@@ -0,0 +1,85 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+"""
+Small in-memory BM25 index over identifier-style text.
+Used to pick the schema tables and SQL tools relevant to a user prompt.
+"""
+
+STOPWORDS = {
+    "a", "all", "an", "and", "any", "are", "as", "at", "be", "by", "can", "did", "do", "does",
+    "each", "for", "from", "get", "give", "has", "have", "how", "i", "in", "is", "it", "list",
+    "me", "my", "of", "on", "or", "our", "s", "show", "tell", "that", "the", "their", "them", "there",
+    "these", "this", "to", "was", "we", "were", "what", "when", "where", "which", "who", "why",
+    "with", "you",
+}
+
+
+def _stem(token: str) -> str:
+    # Plural folding is enough to match "products" against a "product" table
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text and identifiers (snake_case, camelCase, dotted) into lower-cased,
+    plural-folded tokens with stopwords removed.
+    """
+    if not text:
+        return []
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    text = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1 \2", text)
+    return [
+        _stem(token)
+        for token in re.split(r"[^a-z0-9]+", text.lower())
+        if token and token not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    """
+    Okapi BM25 ranking over a fixed set of tokenized documents.
+    """
+    def __init__(self, documents: Dict[str, List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs: Dict[str, Counter] = {doc_id: Counter(tokens) for doc_id, tokens in documents.items()}
+        self.doc_lengths: Dict[str, int] = {doc_id: len(tokens) for doc_id, tokens in documents.items()}
+        self.avg_length = (sum(self.doc_lengths.values()) / len(documents)) if documents else 0.0
+
+        self.postings: Dict[str, List[str]] = defaultdict(list)
+        for doc_id, freqs in self.term_freqs.items():
+            for term in freqs:
+                self.postings[term].append(doc_id)
+
+        total = len(documents)
+        self.idf: Dict[str, float] = {
+            term: math.log(1 + (total - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for term, doc_ids in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.term_freqs)
+
+    def search(self, query_tokens: Iterable[str], top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Rank documents against the query tokens. Returns `(doc_id, score)` pairs with a
+        positive score, best first.
+        """
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(query_tokens):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id in self.postings[term]:
+                tf = self.term_freqs[doc_id][term]
+                norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top_k] if top_k else ranked
@@ -0,0 +1,54 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+from tools.text_index import BM25Index, tokenize
+
+"""
+Inverted index over SQL tool definitions, so only the tools matching a prompt
+are sent to the LLM instead of the whole `tools` table.
+"""
+
+# Tool names count more than descriptions when ranking
+TOOL_NAME_WEIGHT = 3
+# tool_config entries that hold free-text search keywords
+KEYWORD_FIELDS = ("keywords", "tags", "aliases")
+
+
+def _config_keywords(tool_config: Any) -> List[str]:
+    if not isinstance(tool_config, dict):
+        return []
+    tokens: List[str] = []
+    for field in KEYWORD_FIELDS:
+        value = tool_config.get(field)
+        if isinstance(value, str):
+            tokens += tokenize(value)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                tokens += tokenize(str(item))
+    return tokens
+
+
+class ToolIndex:
+    """
+    BM25 index over `Tool.name`, `Tool.description` and tool_config keywords.
+    """
+    def __init__(self, tools: Sequence[Any]):
+        self.tools: Dict[str, Any] = {}
+        documents: Dict[str, List[str]] = {}
+        for tool in tools:
+            key = str(tool.tool_id)
+            self.tools[key] = tool
+            documents[key] = (
+                tokenize(tool.name) * TOOL_NAME_WEIGHT
+                + tokenize(tool.description)
+                + _config_keywords(tool.tool_config)
+            )
+        self.index = BM25Index(documents)
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def search(self, prompt: str, top_k: int = 5) -> List[Tuple[Any, float]]:
+        """
+        Return the `(tool, score)` pairs best matching a prompt, best first.
+        """
+        return [(self.tools[key], score) for key, score in self.index.search(tokenize(prompt), top_k=top_k)]
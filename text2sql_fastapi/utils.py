@@ -1,4 +1,5 @@
 from passlib.context import CryptContext
+from cryptography.fernet import Fernet
 from datetime import timedelta, datetime
 import jwt
 from config import settings
@@ -52,4 +53,18 @@ def decode_token(token: str) -> dict:
         return token_data
     except jwt.PyJWTError as e:
         logging.exception(e)
-        return None
\ No newline at end of file
+        return None
+
+def encrypt_secret(value: str) -> str:
+    """
+    Encrypt a stored credential (e.g. a registered database password) with the
+    configured Fernet key.
+    """
+    return Fernet(settings.database_encryption_key.encode("utf-8")).encrypt(value.encode("utf-8")).decode("utf-8")
+
+def decrypt_secret(token: str) -> str:
+    """
+    Decrypt a credential encrypted with `encrypt_secret`.
+    Raises cryptography's InvalidToken if it was encrypted with another key.
+    """
+    return Fernet(settings.database_encryption_key.encode("utf-8")).decrypt(token.encode("utf-8")).decode("utf-8")